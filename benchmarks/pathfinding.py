@@ -0,0 +1,208 @@
+"""
+Headless pathfinding benchmarks.
+
+Builds the same cost grid the game searches, both from worldmap.tmx and
+from generated maps, then runs a fixed set of queries through each
+pathfinding strategy. Nothing here touches pyasge or FMOD, so it runs
+without a window, GPU or audio device.
+
+Run from the repository root:
+
+    python -m benchmarks.pathfinding
+    python -m benchmarks.pathfinding --sizes all --queries 50
+    python -m benchmarks.pathfinding --scenarios maze --strategies astar,jps+
+"""
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+import numpy as np
+import pytmx
+
+from game.gameobjects.mapdata import read_layers
+from game.pathfinding.components import ComponentIndex
+from game.pathfinding.grid import CostGrid, IMPASSABLE
+from game.pathfinding.strategies import PATHFINDERS
+
+WORLD_MAP = "./data/worldmap.tmx"
+DEEP_SEA = 1
+SHALLOWS = 11
+LAND = 101
+
+DEFAULT_SIZES = ("60x34", "250x250", "500x500")
+ALL_SIZES = DEFAULT_SIZES + ("1000x1000", "2000x2000")
+
+
+def open_water(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """Deep sea with a light scattering of rocks"""
+    costs = np.full((height, width), DEEP_SEA, dtype=np.int32)
+    costs[rng.random((height, width)) < 0.03] = LAND
+    return costs
+
+
+def maze(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """A one tile wide maze with a few walls knocked through so routes can loop"""
+    costs = np.full((height, width), LAND, dtype=np.int32)
+    columns = (width - 1) // 2
+    rows = (height - 1) // 2
+    visited = np.zeros((rows, columns), dtype=bool)
+    stack = [(0, 0)]
+    visited[0, 0] = True
+    costs[1, 1] = DEEP_SEA
+    steps = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+    while stack:
+        cx, cy = stack[-1]
+        options = [(dx, dy) for dx, dy in steps
+                   if 0 <= cx + dx < columns and 0 <= cy + dy < rows and not visited[cy + dy, cx + dx]]
+        if not options:
+            stack.pop()
+            continue
+
+        dx, dy = options[rng.integers(len(options))]
+        visited[cy + dy, cx + dx] = True
+        costs[2 * cy + 1 + dy, 2 * cx + 1 + dx] = DEEP_SEA
+        costs[2 * (cy + dy) + 1, 2 * (cx + dx) + 1] = DEEP_SEA
+        stack.append((cx + dx, cy + dy))
+
+    holes = rng.random((height, width)) < 0.05
+    holes[0, :] = holes[-1, :] = holes[:, 0] = holes[:, -1] = False
+    costs[holes] = DEEP_SEA
+    return costs
+
+
+def archipelago(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """Clumps of islands ringed with shallows, like worldmap.tmx"""
+    noise = rng.random((height, width))
+    for _ in range(4):
+        noise = (noise + np.roll(noise, 1, 0) + np.roll(noise, -1, 0) +
+                 np.roll(noise, 1, 1) + np.roll(noise, -1, 1)) / 5
+    land = noise > np.quantile(noise, 0.8)
+
+    near = land.copy()
+    for _ in range(2):
+        near = near | np.roll(near, 1, 0) | np.roll(near, -1, 0) | np.roll(near, 1, 1) | np.roll(near, -1, 1)
+
+    costs = np.full((height, width), DEEP_SEA, dtype=np.int32)
+    costs[near] = SHALLOWS
+    costs[land] = LAND
+    return costs
+
+
+def world_map(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """The game's own map, the requested size is ignored"""
+    return read_layers(pytmx.TiledMap(WORLD_MAP))[1]
+
+
+SCENARIOS = {
+    "worldmap": world_map,
+    "open": open_water,
+    "maze": maze,
+    "archipelago": archipelago,
+}
+
+
+def make_queries(grid: CostGrid, count: int, seed: int) -> list[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """Picks start and goal pairs that are connected, so every query has an answer"""
+    components = ComponentIndex(grid)
+    sizes = {}
+    for cell, label in enumerate(components.labels):
+        if label >= 0:
+            root = components.label(*grid.xy(cell))
+            sizes[root] = sizes.get(root, 0) + 1
+    largest = max(sizes, key=sizes.get)
+
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < count:
+        start = (rng.randrange(grid.width), rng.randrange(grid.height))
+        goal = (rng.randrange(grid.width), rng.randrange(grid.height))
+        if components.label(*start) == largest and components.label(*goal) == largest:
+            queries.append((start, goal))
+    return queries
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(factory: Callable, grid: CostGrid, queries: list, alloc_samples: int) -> dict:
+    """Times a strategy over the queries and samples the memory each query allocates"""
+    started = time.perf_counter()
+    pathfinder = factory(grid)
+    pathfinder.find(*queries[0])  # strategies may build their tables lazily
+    build = time.perf_counter() - started
+
+    latencies = []
+    expansions = []
+    for start, goal in queries:
+        started = time.perf_counter()
+        pathfinder.find(start, goal)
+        latencies.append(time.perf_counter() - started)
+        expansions.append(pathfinder.expanded)
+
+    # tracemalloc slows everything down, so it gets a pass of its own
+    allocations = []
+    tracemalloc.start()
+    for start, goal in queries[:alloc_samples]:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        pathfinder.find(start, goal)
+        allocations.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    return {
+        "build": build,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "expanded": statistics.mean(expansions),
+        "alloc": statistics.mean(allocations) if allocations else 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES),
+                        help="comma separated WxH sizes, or 'all' for " + ",".join(ALL_SIZES))
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--strategies", default=",".join(PATHFINDERS))
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--alloc-samples", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    sizes = ALL_SIZES if args.sizes == "all" else tuple(args.sizes.split(","))
+    strategies = args.strategies.split(",")
+
+    print(f"{'scenario':<12}{'size':>10}{'strategy':>10}{'build s':>10}"
+          f"{'p50 ms':>10}{'p99 ms':>10}{'expanded':>10}{'alloc KiB':>11}")
+
+    for scenario in args.scenarios.split(","):
+        for size in sizes:
+            width, height = (int(n) for n in size.split("x"))
+            costs = SCENARIOS[scenario](width, height, np.random.default_rng(args.seed))
+            grid = CostGrid(costs.tolist())
+            walkable = int((costs < IMPASSABLE).sum())
+            if walkable < 2:
+                continue
+
+            queries = make_queries(grid, args.queries, args.seed)
+            label = f"{grid.width}x{grid.height}"
+            for strategy in strategies:
+                result = run(PATHFINDERS[strategy], grid, queries, args.alloc_samples)
+                print(f"{scenario:<12}{label:>10}{strategy:>10}{result['build']:>10.3f}"
+                      f"{result['p50'] * 1000:>10.3f}{result['p99'] * 1000:>10.3f}"
+                      f"{result['expanded']:>10.0f}{result['alloc'] / 1024:>11.1f}")
+
+            # the world map is a fixed size, so only run it once
+            if scenario == "worldmap":
+                break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Headless simulation benchmark.
+
+Loads worldmap.tmx without a renderer and plays a scripted match on the
+game's simulation: the player sails between random points on the map
+while firing at the nearest enemy, and the enemies chase it along the
+flow field. Every run is seeded, so the final state is hashed and the
+run repeated to check it comes out the same. Nothing here touches
+pyasge or FMOD, so it runs without a window, GPU or audio device.
+
+Run from the repository root:
+
+    python -m benchmarks.simulation
+    python -m benchmarks.simulation --ticks 100000 --enemies 50 --fire-every 5
+"""
+
+import argparse
+import hashlib
+import math
+import time
+
+from game.gameobjects.mapcache import load_map
+from game.gameobjects.mapstream import is_infinite, load_stream
+from game.pathfinding.strategies import PATHFINDERS
+from game.simulation import ShipState, Simulation
+
+WORLD_MAP = "./data/worldmap.tmx"
+PLAYER_START = (5407, 775)
+PLAYER_SPEED = 750
+ENEMY_SPEED = 250
+SHIP_SIZE = (66, 113)
+
+
+def make_ship(x: float, y: float, speed: float, chase: bool) -> ShipState:
+    ship = ShipState()
+    ship.x, ship.y = x, y
+    ship.width, ship.height = SHIP_SIZE
+    ship.speed = speed
+    ship.chase = chase
+    return ship
+
+
+def setup(data, enemies: int, seed: int) -> Simulation:
+    """Builds a simulation with the player at its usual start and the enemies at random spawn points"""
+    simulation = Simulation.from_map_data(data, seed=seed)
+    simulation.add_ship(make_ship(*PLAYER_START, PLAYER_SPEED, False))
+
+    spawns = [tuple(spawn) for spawn in data.spawns.tolist()]
+    for _ in range(enemies):
+        x, y = simulation.random.choice(spawns)
+        simulation.add_ship(make_ship(x, y, ENEMY_SPEED, True))
+    return simulation
+
+
+def play(simulation: Simulation, ticks: int, fire_every: int) -> dict:
+    """Steps a scripted match, returning how long it took and what happened"""
+    grid = simulation.flow_field.grid
+    pathfinder = PATHFINDERS["astar"](grid)
+    player = simulation.ships[0]
+    tile_width, tile_height = simulation.tile_size
+    events = {}
+    routes = 0
+    stepping = 0.0
+
+    for tick in range(ticks):
+        # pick somewhere new to sail to once the last route is done
+        if not player.route:
+            start = simulation.tile(*player.midpoint())
+            goal = (simulation.random.randrange(grid.width), simulation.random.randrange(grid.height))
+            path = pathfinder.find(start, goal) if grid.in_bounds(*start) else None
+            if path:
+                simulation.sail(0, [((x + 0.5) * tile_width, (y + 0.5) * tile_height) for x, y in path])
+                routes += 1
+
+        # fire at the closest enemy still afloat
+        if fire_every and tick % fire_every == 0:
+            mid_x, mid_y = player.midpoint()
+            afloat = [ship for ship in simulation.ships[1:] if ship.hp > 0]
+            if afloat:
+                target = min(afloat, key=lambda ship: math.dist(ship.midpoint(), (mid_x, mid_y)))
+                simulation.fire(0, mid_x, mid_y, *target.midpoint())
+
+        started = time.perf_counter()
+        simulation.step()
+        stepping += time.perf_counter() - started
+
+        for event, _ in simulation.events:
+            events[event] = events.get(event, 0) + 1
+
+    return {"seconds": stepping, "events": events, "routes": routes}
+
+
+def digest(simulation: Simulation) -> str:
+    """A hash of every ship and cannonball, which matches only if two runs ended the same"""
+    state = hashlib.blake2b(digest_size=8)
+    for ship in simulation.ships:
+        state.update(repr((ship.x, ship.y, ship.rotation, ship.hp, ship.route)).encode())
+
+    projectiles = simulation.projectiles
+    state.update(projectiles.positions[:projectiles.count].tobytes())
+    state.update(projectiles.owners[:projectiles.count].tobytes())
+    return state.hexdigest()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--map", default=WORLD_MAP)
+    parser.add_argument("--ticks", type=int, default=20000)
+    parser.add_argument("--enemies", type=int, default=5)
+    parser.add_argument("--fire-every", type=int, default=30, help="ticks between shots, 0 never fires")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    data = load_stream(args.map) if is_infinite(args.map) else load_map(args.map)
+
+    results = []
+    for _ in range(2):
+        simulation = setup(data, args.enemies, args.seed)
+        result = play(simulation, args.ticks, args.fire_every)
+        result["digest"] = digest(simulation)
+        result["peak"] = simulation.projectiles.peak
+        results.append(result)
+
+    first = results[0]
+    print(f"{args.ticks} ticks, {args.enemies} enemies, a shot every {args.fire_every} ticks")
+    print(f"  {args.ticks / first['seconds']:,.0f} ticks/s ({first['seconds'] * 1e6 / args.ticks:.1f} us per tick)")
+    print(f"  {first['routes']} routes, cannonballs peaked at {first['peak']}, events {first['events']}")
+    print(f"  final state {first['digest']}, "
+          f"{'deterministic' if first['digest'] == results[1]['digest'] else 'NOT deterministic'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import queue
+import threading
+
+import pyasge
+
+
+class AssetManager:
+    """
+    A shared cache of the textures used by the game
+
+    Textures are loaded once per file and handed out to every sprite that
+    asks for them. Each texture is reference counted, and when `evict` is
+    set, a texture whose count drops to zero is let go.
+
+    Each game state can register a manifest of the files it uses. A
+    state's files can be read ahead of time on a worker thread while the
+    current state is still running, then uploaded in one go when the
+    state is entered, so nothing spawned during play has to wait on the
+    disk. Textures have to be created on the renderer's thread, so only
+    the file reads happen on the worker.
+
+    Args:
+        renderer (pyasge.Renderer): The renderer that creates the textures
+        evict (bool): Free textures as soon as nothing is using them
+    """
+
+    def __init__(self, renderer: pyasge.Renderer, evict: bool = False) -> None:
+        self.renderer = renderer
+        self.evict = evict
+        self.textures = {}
+        self.refs = {}
+        self.keys = {}
+        self.manifests = {}
+
+        # textures loaded after a manifest was, which should have been in it
+        self.strict = False
+        self.late_loads = []
+        self.requests = 0
+        self.loads = 0
+
+        self.lock = threading.Lock()
+        self.reads = queue.Queue()
+        self.prefetched = set()
+        self.worker = None
+
+    def texture(self, filename: str) -> pyasge.Texture:
+        """ The texture for a file, loading it if it's not cached """
+        self.requests += 1
+
+        key = self._key(filename)
+        texture = self.textures.get(key)
+        if texture is None:
+            texture = self.renderer.loadTexture(filename)
+            self.textures[key] = texture
+            self.refs.setdefault(key, 0)
+            self.loads += 1
+            if self.strict:
+                self.late_loads.append(filename)
+        return texture
+
+    def acquire(self, filename: str) -> pyasge.Texture:
+        """ Takes a reference to a file's texture """
+        texture = self.texture(filename)
+        self.refs[self._key(filename)] += 1
+        return texture
+
+    def release(self, filename: str) -> None:
+        """ Drops a reference to a file's texture, freeing it if it's unused and eviction is on """
+        key = self._key(filename)
+        if self.refs.get(key, 0) > 0:
+            self.refs[key] -= 1
+            if self.evict and self.refs[key] == 0:
+                del self.textures[key]
+                del self.refs[key]
+
+    def attach(self, sprite: pyasge.Sprite, filename: str) -> bool:
+        """
+        Gives a sprite the shared texture for a file, instead of it loading its own
+
+        The sprite holds a reference until its owner calls `detach`, so a
+        texture is never evicted while something can still draw with it.
+        """
+        return sprite.attach(self.acquire(filename))
+
+    def detach(self, filename: str) -> None:
+        """ Drops the reference a sprite took in `attach`, for when its owner is done with it """
+        self.release(filename)
+
+    def register(self, state, filenames: list[str]) -> None:
+        """ Sets the files a game state uses """
+        self.manifests[state] = list(filenames)
+
+    def prefetch(self, state) -> None:
+        """ Starts reading a state's files on the worker thread """
+        for filename in self.manifests.get(state, []):
+            with self.lock:
+                if self._key(filename) in self.textures or filename in self.prefetched:
+                    continue
+                self.prefetched.add(filename)
+            self.reads.put(filename)
+
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._read_worker, name="asset-prefetch", daemon=True)
+            self.worker.start()
+
+    def load(self, state) -> None:
+        """
+        Uploads every texture a state uses and holds on to them
+
+        Once a manifest is loaded, any texture still missing from the
+        cache is noted in `late_loads`, as it means a trip to the disk
+        during play.
+        """
+        self.strict = False
+        for filename in self.manifests.get(state, []):
+            self.acquire(filename)
+        self.strict = True
+
+    def unload(self, state) -> None:
+        """ Lets go of the textures a state loaded """
+        for filename in self.manifests.get(state, []):
+            self.release(filename)
+
+    def _read_worker(self) -> None:
+        while True:
+            filename = self.reads.get()
+
+            # reading the file pulls it in to the OS cache, so the upload
+            # on the renderer's thread doesn't wait on the disk
+            try:
+                with open(self._local_path(filename), "rb") as file:
+                    while file.read(1 << 20):
+                        pass
+            except OSError:
+                pass
+
+    def _key(self, filename: str) -> str:
+        # files can be named in different ways, e.g. "a.png", "./a.png" and "/a.png", and
+        # resolving them touches the disk, so each name is only resolved the first time
+        key = self.keys.get(filename)
+        if key is None:
+            key = self.keys[filename] = os.path.normcase(os.path.realpath(self._local_path(filename)))
+        return key
+
+    @staticmethod
+    def _local_path(filename: str) -> str:
+        # pyasge mounts the game folder as "/", so "/data/a.png" is "./data/a.png"
+        if not os.path.exists(filename) and filename.startswith("/"):
+            return "." + filename
+        return filename
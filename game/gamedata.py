@@ -1,5 +1,7 @@
 import pyfmodex
 
+from game.profiler import Profiler
+
 class GameData:
     """
     GameData stores the data that needs to be shared
@@ -11,6 +13,7 @@ class GameData:
     """
 
     def __init__(self) -> None:
+        self.assets = None
         self.audio_system = pyfmodex.System()
         self.bg_audio = None
         self.bg_audio_channel = None
@@ -20,5 +23,6 @@ class GameData:
         self.game_res = [12, 5]
         self.inputs = None
         self.player = None
+        self.profiler = Profiler()
         self.renderer = None
         self.score = 0
@@ -1,41 +1,73 @@
 import pyasge
-CANNONBALL_SPEED = 8
+
+from game.assets import AssetManager
+from game.simulation import CANNONBALL_SIZE, Projectiles
+CANNONBALL_TEXTURE = "data/sprites/ship parts/cannonBall.png"
 
 
 class Cannonball:
 
     """Represents a cannonball projectile that can be fired"""
-    def __init__(self, spawn: pyasge.Point2D, dest: pyasge.Point2D) -> None:
+    texture = CANNONBALL_TEXTURE
+
+    def __init__(self, assets: AssetManager) -> None:
         self.sprite = pyasge.Sprite()
-        self.sprite.loadTexture("data/sprites/ship parts/cannonBall.png")
-        self.sprite.width = 10
-        self.sprite.height = 10
-        self.sprite.x = spawn.x
-        self.sprite.y = spawn.y
+        assets.attach(self.sprite, CANNONBALL_TEXTURE)
+        self.sprite.width = CANNONBALL_SIZE
+        self.sprite.height = CANNONBALL_SIZE
         self.sprite.z_order = 50
-        self.destination = pyasge.Point2D(dest.x - self.sprite.width * 0.5, dest.y - self.sprite.width * 0.5)
 
-    def fixed_update(self, game_time: pyasge.GameTime) -> None:
-        self.sprite.x += (self.destination.x - self.sprite.x) * CANNONBALL_SPEED * game_time.fixed_timestep
-        self.sprite.y += (self.destination.y - self.sprite.y) * CANNONBALL_SPEED * game_time.fixed_timestep
+    def render(self, renderer: pyasge.Renderer, game_time: pyasge.GameTime) -> None:
+        renderer.render(self.sprite)
 
-    def update(self, game_time: pyasge.GameTime) -> None:
-        if self.destination.distance([self.sprite.x, self.sprite.y]) < 5:
-            self.sprite.z_order = 0
 
-        if abs(self.destination.x - self.sprite.x) < 0.01:
-            self.sprite.x = self.destination.x
+class CannonballPool:
+    """
+    The sprites that draw the simulation's cannonballs
 
-        if abs(self.destination.y - self.sprite.y) < 0.01:
-            self.sprite.y = self.destination.y
+    The cannonballs themselves are simulated together in `Projectiles`.
+    All cannonballs look alike, so rather than each one owning a sprite,
+    there's one made up front for every cannonball that can be in
+    flight, and each frame they're handed out to the ones in view.
+    Firing never creates a sprite or asks for a texture.
 
-    def render(self, renderer: pyasge.Renderer, game_time: pyasge.GameTime) -> None:
-        renderer.render(self.sprite)
+    Args:
+        assets (AssetManager): Shares the cannonball texture with every sprite
+        projectiles (Projectiles): The simulated cannonballs
+    """
+
+    def __init__(self, assets: AssetManager, projectiles: Projectiles) -> None:
+        self.projectiles = projectiles
+        self.sprites = [Cannonball(assets) for _ in range(projectiles.capacity)]
 
     @property
-    def position(self) -> pyasge.Point2D:
-        return pyasge.Point2D(self.sprite.x, self.sprite.y)
+    def capacity(self) -> int:
+        return self.projectiles.capacity
 
     @property
-    def world_bounds(self):
-        return self.sprite.getWorldBounds()
+    def peak(self) -> int:
+        return self.projectiles.peak
+
+    def visible(self, view) -> list:
+        """
+        Moves a sprite to each cannonball in view
+
+        Args:
+            view (pyasge.CameraView): The camera's view
+
+        Returns:
+            list: A Cannonball for each one in view
+        """
+        projectiles = self.projectiles
+        in_view = projectiles.in_view(view.min_x, view.min_y, view.max_x, view.max_y)
+
+        shown = self.sprites[:len(in_view)]
+        for cannonball, (x, y), splashing in zip(shown, projectiles.positions[in_view].tolist(),
+                                                 projectiles.splashing[in_view].tolist()):
+            cannonball.sprite.x = x
+            cannonball.sprite.y = y
+            cannonball.sprite.z_order = 0 if splashing else 50
+        return shown
+
+    def __len__(self) -> int:
+        return self.projectiles.count
@@ -1,44 +1,76 @@
 import copy
-from functools import partial
+import time
+from collections import OrderedDict
 from typing import Tuple
 
+import numpy as np
 import pyasge
-import pytmx
-from pytmx import TiledTileLayer
+from pytmx import TileFlags
 
+from game.assets import AssetManager
+from game.gameobjects.mapcache import load_map
+from game.gameobjects.mapstream import PREFETCH_BLOCKS, gather, is_infinite, load_stream
+from game.pathfinding.cache import MISSING, PathCache
+from game.pathfinding.components import ComponentIndex
+from game.pathfinding.fields import distance_transform, region_sum, summed_area
+from game.pathfinding.flowfield import FlowField
+from game.pathfinding.grid import CostGrid, IMPASSABLE
+from game.pathfinding.smoothing import smooth
+from game.pathfinding.strategies import PATHFINDERS
+from game.profiler import Profiler
 
-def other_library_loader(renderer: pyasge.Renderer, filename, colorkey, **kwargs):
+MAP_FILE = "./data/worldmap.tmx"
 
-    """Converts a tmx tile into a `pyasge.Tile`"""
-    def extract_image(rect, flags):
-        pyasge_tile = pyasge.Tile()
-        pyasge_tile.texture = renderer.loadTexture(filename)
-        pyasge_tile.texture.setMagFilter(pyasge.MagFilter.NEAREST)
-        pyasge_tile.width = rect[2]
-        pyasge_tile.height = rect[3]
-        pyasge_tile.src_rect = rect
-        pyasge_tile.visible = True
-
-        # rotate the tile on both axis if needed
-        if flags.flipped_diagonally:
-            if flags.flipped_vertically:
-                pyasge_tile.rotation = 4.71239
-            else:
-                pyasge_tile.rotation = 1.5708
+# maps with more tiles than this search the HPA* cluster graph by default
+HPA_MIN_TILES = 128 * 128
+
+# the map is baked in to square chunks of this many tiles
+CHUNK_TILES = 16
+CHUNK_MARGIN = 1
+MAX_CHUNKS = 24
 
-        # or maybe just on a single axis
+
+def make_tile(texture: pyasge.Texture, rect, flags: TileFlags) -> pyasge.Tile:
+
+    """Converts a tmx tile into a `pyasge.Tile`"""
+    pyasge_tile = pyasge.Tile()
+    pyasge_tile.texture = texture
+    pyasge_tile.width = rect[2]
+    pyasge_tile.height = rect[3]
+    pyasge_tile.src_rect = rect
+    pyasge_tile.visible = True
+
+    # rotate the tile on both axis if needed
+    if flags.flipped_diagonally:
+        if flags.flipped_vertically:
+            pyasge_tile.rotation = 4.71239
         else:
-            if flags.flipped_horizontally:
-                pyasge_tile.src_rect[0] += pyasge_tile.src_rect[2]
-                pyasge_tile.src_rect[2] *= -1
+            pyasge_tile.rotation = 1.5708
 
-            if flags.flipped_vertically:
-                pyasge_tile.src_rect[1] += pyasge_tile.src_rect[3]
-                pyasge_tile.src_rect[3] *= -1
+    # or maybe just on a single axis
+    else:
+        if flags.flipped_horizontally:
+            pyasge_tile.src_rect[0] += pyasge_tile.src_rect[2]
+            pyasge_tile.src_rect[2] *= -1
 
-        return pyasge_tile
+        if flags.flipped_vertically:
+            pyasge_tile.src_rect[1] += pyasge_tile.src_rect[3]
+            pyasge_tile.src_rect[3] *= -1
 
-    return extract_image
+    return pyasge_tile
+
+
+class MapChunk:
+
+    """A square block of the map's tiles baked in to its own render target"""
+    def __init__(self, renderer: pyasge.Renderer, x: int, y: int, width: int, height: int, tile_size):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.px_wide = width * tile_size[0]
+        self.px_high = height * tile_size[1]
+        self.rt = pyasge.RenderTarget(renderer, self.px_wide, self.px_high, pyasge.Texture.Format.RGBA, 1)
 
 
 class GameMap:
@@ -47,50 +79,253 @@ class GameMap:
     The GameMap is the heart of soul of the game world.
 
     It's made up from tiles that are stored in 2D dimensional arrays.
+    Infinite maps are streamed instead, with their tiles paged in a
+    block at a time as the player sails towards them.
+
     To improve performance when rendering the game, these tiles are
-    pre-rendered on to a large texture and rendered in a single pass
+    pre-rendered on to chunks of texture. Only the chunks the camera
+    can see are drawn, and chunks are baked when they first come near
+    the view and dropped again once they're far away.
     """
 
-    def __init__(self, renderer):
-        tmxdata = pytmx.TiledMap("./data/worldmap.tmx", partial(other_library_loader, renderer))
+    def __init__(self, renderer, assets: AssetManager = None, profiler: Profiler = None):
+        started = time.perf_counter()
+        self.assets = assets or AssetManager(renderer)
+        self.profiler = profiler or Profiler()
+        data = load_stream(MAP_FILE) if is_infinite(MAP_FILE) else load_map(MAP_FILE)
+        self.store = data.store
 
         # set the map's dimensions and tile sizes
-        self.width = tmxdata.width
-        self.height = tmxdata.height
-        self.tile_size = [tmxdata.tilewidth, tmxdata.tileheight]
+        self.width = data.width
+        self.height = data.height
+        self.tile_size = list(data.tile_size)
         self.redraw = True
 
         # store the islands bounding boxes, in case they're needed
-        self.islands = []
-        for rect in tmxdata.layernames["NoGo"]:
-            self.islands.append([rect.x, rect.y, rect.width, rect.height])
+        self.islands = data.islands.tolist()
 
         # store the enemy spawn positions
-        self.spawns = []
-        for obj in tmxdata.layernames["Spawns"]:
-            self.spawns.append((obj.x, obj.y))
+        self.spawns = [tuple(spawn) for spawn in data.spawns.tolist()]
+
+        # the baked chunks of the map, least recently drawn first
+        self.chunks = OrderedDict()
+        self.chunk_px = [CHUNK_TILES * self.tile_size[0], CHUNK_TILES * self.tile_size[1]]
+        self.chunk_columns = -(-self.width // CHUNK_TILES)
+        self.chunk_rows = -(-self.height // CHUNK_TILES)
+
+        # tiles edited since their chunk was baked, as a (x0, y0, x1, y1) rect per chunk
+        self.dirty = {}
+
+        # the gid of every cell in each tile layer and the pathfinding costs
+        self.layers, self.costs = data.layers, data.costs
+        self.layer_costs = data.layer_costs
+
+        # the tiles are made on the renderer's thread the first time the map is drawn,
+        # so the rest of the map can be loaded in the background
+        self.tile_table = (data.tiles, data.tiled_gids, data.tilesets)
+        self.tiles = {}
+        self.gid_tiles = None
+
+        # counting a streamed map's cells would page in every block
+        if self.store is not None:
+            cells = self.store.cells
+        else:
+            cells = sum(int(np.count_nonzero(gids)) for gids in self.layers.values())
+
+        # flattened copy of the costs that the pathfinder searches
+        self.grid = CostGrid(self.costs.tolist())
+        self.pathfinders = {}
+        self.path_cache = PathCache(self.grid)
+        self.any_angle = True
+        self.strategy = "hpa" if self.width * self.height > HPA_MIN_TILES else "astar"
+        self.pathfinder(self.strategy)
+
+        # regions of connected water, used to turn away unreachable clicks
+        self.components = ComponentIndex(self.grid)
+        self.snap_unreachable = True
+
+        # shared by every ship that is chasing the same target
+        self.flow_field = FlowField(self.grid)
+
+        # summed-area table of the costs, rebuilt when the costs change
+        self._cost_table = None
+
+        # how much work loading the map took, for comparing loaders
+        self.load_stats = {
+            "seconds": time.perf_counter() - started,
+            "cells": cells,
+        }
+
+    def build_tiles(self) -> None:
+        """ Creates one shared tile per (gid, flip flags), every cell using it points at the same object """
+        started = time.perf_counter()
+        requests = self.assets.requests
+        tiles, tiled_gids, tilesets = self.tile_table
+
+        gid_tiles = [None] * len(tiles)
+        for gid, (tileset, *rect, flip_h, flip_v, flip_d) in enumerate(tiles.tolist()):
+            if tileset < 0:
+                continue
+
+            flags = TileFlags(flip_h, flip_v, flip_d)
+            key = (int(tiled_gids[gid]), flags)
+            if key not in self.tiles:
+                texture = self.assets.acquire(tilesets[tileset])
+                texture.setMagFilter(pyasge.MagFilter.NEAREST)
+                self.tiles[key] = make_tile(texture, rect, flags)
+            gid_tiles[gid] = self.tiles[key]
+        self.gid_tiles = gid_tiles
+
+        self.load_stats.update({
+            "tile_seconds": time.perf_counter() - started,
+            "texture_requests": self.assets.requests - requests,
+            "textures": len({id(tile.texture) for tile in self.tiles.values()}),
+            "tiles": len(self.tiles),
+        })
+
+    def pathfinder(self, strategy: str = None):
+        """ Returns the pathfinder for a strategy, building it the first time it's needed """
+        strategy = strategy or self.strategy
+        if strategy not in self.pathfinders:
+            self.pathfinders[strategy] = PATHFINDERS[strategy](self.grid)
+        return self.pathfinders[strategy]
+
+    def find_path(self, start: Tuple[int, int], goal: Tuple[int, int], strategy: str = None,
+                  any_angle: bool = None):
+        """ Finds the tiles to visit between two tile locations
 
-        # this is the offscreen render target that will be used to store the rendered map
-        """create a new render target and sprite to store the render texture"""
-        self.rt = pyasge.RenderTarget(
-            renderer,
-            self.width * self.tile_size[0], self.height * self.tile_size[1],
-            pyasge.Texture.Format.RGBA, 1)
+        Args:
+            start (Tuple[int,int]): The tile to start from
+            goal (Tuple[int,int]): The tile to reach
+            strategy (str): One of PATHFINDERS, defaults to the map's strategy
+            any_angle (bool): Only keep the waypoints where the route turns, defaults to the map's setting
+        """
+        goal = self.reachable_goal(start, goal)
+        if goal is None:
+            return None
+
+        key = self.path_key(start, goal, strategy, any_angle)
+        path = self.path_cache.get(key)
+        if path is MISSING:
+            path = self.store_path(key, self.pathfinder(key[2]).find(start, goal))
+        return path
 
-        self.map = []  # the tiled map
-        self.costs = [[0 for i in range(tmxdata.width)] for j in range(tmxdata.height)]  # pathfinding costs
-        for layer in tmxdata.visible_layers:
-            if isinstance(layer, TiledTileLayer):
+    def reachable_goal(self, start: Tuple[int, int], goal: Tuple[int, int]):
+        """ Checks a goal can be reached before anything searches for it
 
-                tiles = [[None for i in range(layer.width)] for j in range(layer.height)]
-                for x, y, tile in layer.tiles():
-                    # use the tile image to create and position the map
-                    tiles[y][x] = pyasge.Tile(tile)
+        Goals in a different body of water to the start are either moved
+        to the nearest tile that can be reached, or rejected with None
+        when snap_unreachable is off.
+
+        Args:
+            start (Tuple[int,int]): The tile the route starts from
+            goal (Tuple[int,int]): The tile the route should reach
+        """
+        if self.components.connected(start, goal):
+            return goal
+
+        # ships nudged on to a blocked tile are left for the search to sort out
+        if not self.grid.walkable(*start):
+            return goal
+
+        return self.components.nearest(goal, start) if self.snap_unreachable else None
+
+    def path_key(self, start: Tuple[int, int], goal: Tuple[int, int], strategy: str = None,
+                 any_angle: bool = None) -> tuple:
+        """ The key a path is cached under, with the map's defaults filled in """
+        strategy = strategy or self.strategy
+        any_angle = self.any_angle if any_angle is None else any_angle
+        return start, goal, strategy, any_angle
+
+    def store_path(self, key: tuple, path):
+        """ Post-processes a freshly found path and caches it under its key """
+        if path and key[3]:
+            path = smooth(self.grid, path)
+        self.path_cache.put(key, path)
+        return path
+
+    def set_cost(self, x: int, y: int, cost: int) -> None:
+        """ Changes the pathfinding cost of a single tile """
+        self.costs[y, x] = cost
+        self.grid.set_cost(x, y, int(cost))
+
+    def set_tile(self, layer: str, x: int, y: int, gid: int) -> None:
+        """
+        Changes the tile in one cell of a layer
+
+        The cell's pathfinding cost is updated straight away and the cell
+        is queued to be redrawn in its chunk on the next render, if that
+        chunk has been baked.
+
+        Args:
+            layer (str): The name of the tile layer
+            x (int): The tile's column
+            y (int): The tile's row
+            gid (int): The tile to place, as stored in `layers`, or 0 to clear the cell
+        """
+        gids = self.layers[layer]
+        previous = int(gids[y, x])
+        if previous == gid:
+            return
 
-                    # update the cost map with using the layer cost
-                    self.costs[y][x] += layer.properties["cost"]
+        gids[y, x] = gid
 
-                self.map.append((layer.name, tiles))
+        # each layer adds its cost to the cells it covers
+        change = self.layer_costs[layer] * ((gid != 0) - (previous != 0))
+        if change:
+            self.set_cost(x, y, int(self.costs[y, x]) + change)
+
+        key = (x // CHUNK_TILES, y // CHUNK_TILES)
+        if key in self.chunks:
+            rect = self.dirty.get(key, (x, y, x, y))
+            self.dirty[key] = (min(rect[0], x), min(rect[1], y), max(rect[2], x), max(rect[3], y))
+
+    def occupancy(self, layer: str) -> np.ndarray:
+        """ A mask of the cells that have a tile in the named layer """
+        return np.asarray(self.layers[layer]) != 0
+
+    def gids_at(self, layer: str, tiles: np.ndarray) -> np.ndarray:
+        """ The gids of many tiles in a layer, given an (n, 2) array of their x and y """
+        return gather(self.layers[layer], tiles)
+
+    def walkable_mask(self) -> np.ndarray:
+        """ A mask of the tiles ships are able to sail across """
+        return self.costs < IMPASSABLE
+
+    def distance_to_land(self, diagonal: bool = True) -> np.ndarray:
+        """ The distance in tiles from every tile to the nearest blocked tile """
+        return distance_transform(self.walkable_mask(), diagonal)
+
+    def region_cost(self, x: int, y: int, width: int, height: int) -> int:
+        """ Sums the costs of a rectangle of tiles in constant time
+
+        Args:
+            x (int): The left-most tile of the region
+            y (int): The top-most tile of the region
+            width (int): The width of the region in tiles
+            height (int): The height of the region in tiles
+        """
+        if self._cost_table is None or self._cost_table[0] != self.grid.version:
+            self._cost_table = (self.grid.version, summed_area(self.costs))
+        return region_sum(self._cost_table[1], x, y, width, height)
+
+    def prefetch(self, world_space: pyasge.Point2D, heading: pyasge.Point2D) -> None:
+        """ Starts paging in the blocks of a streamed map that lie ahead of a ship
+
+        Args:
+            world_space (pyasge.Point2D): Where the ship is
+            heading (pyasge.Point2D): The direction the ship is sailing in
+        """
+        if self.store is None:
+            return
+
+        size = self.store.block_tiles
+        x, y = self.tile(world_space)
+        keys = []
+        for step in range(1, PREFETCH_BLOCKS + 1):
+            ahead = (int((x + heading.x * size * step) // size), int((y + heading.y * size * step) // size))
+            keys.extend((ahead[0] + dx, ahead[1] + dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1))
+        self.store.prefetch(keys)
 
     def tile(self, world_space: pyasge.Point2D) -> Tuple[int, int]:
         """ Translate world space co-ordinates to tile location
@@ -119,32 +354,111 @@ class GameMap:
             ((tile_xy[0] + 1) * self.tile_size[0]) - (self.tile_size[0] * 0.5),
             ((tile_xy[1] + 1) * self.tile_size[1]) - (self.tile_size[1] * 0.5))
 
-    def render(self, renderer: pyasge.Renderer, game_time: pyasge.GameTime) -> None:
-        """ Renders the map and redraws it if needed """
-        px_wide = self.width * self.tile_size[0]
-        px_high = self.height * self.tile_size[1]
-
-        if self.redraw:
-            self.blit(px_high, px_wide, renderer)
-
-        renderer.render(self.rt.buffers[0], [0, 0, px_wide, px_high], 0, 0, px_wide, px_high, 0)
+    def render(self, renderer: pyasge.Renderer, game_time: pyasge.GameTime, view=None) -> None:
+        """ Renders the chunks of the map in view, baking any that are missing
 
-    def blit(self, px_high, px_wide, renderer):
-        """ Renders the game world in to a large single MSAA texture """
-        screen_viewport = renderer.resolution_info.viewport
-        renderer.setRenderTarget(self.rt)
-        renderer.setProjectionMatrix(0, 0, px_wide, px_high)
-        renderer.setViewport(pyasge.Viewport(0, 0, px_wide, px_high))
+        Args:
+            renderer (pyasge.Renderer): The renderer to draw with
+            game_time (pyasge.GameTime): The time between frames
+            view (pyasge.CameraView): The camera's view, the whole map is drawn without it
+        """
+        if self.gid_tiles is None:
+            self.build_tiles()
 
-        for layer in self.map:
-            for row_index, row in enumerate(layer[1]):
-                for col_index, tile in enumerate(row):
+        if self.redraw:
+            self.chunks.clear()
+            self.dirty.clear()
+            self.redraw = False
+
+        # chunks in view must be baked now, the ones around them can wait
+        visible = self.chunks_in(view, 0)
+        baked = False
+        for key in visible:
+            if key not in self.chunks:
+                self.blit(key, renderer)
+                baked = True
+
+        for key in self.chunks_in(view, CHUNK_MARGIN):
+            if key not in self.chunks:
+                self.blit(key, renderer)
+                baked = True
+                break
+
+        # patch edited tiles in to chunks baked before the edit, every layer is drawn
+        # again over the old pixels, which works as the deep sea underneath is opaque
+        for key, rect in self.dirty.items():
+            if key in self.chunks:
+                self.draw_tiles(self.chunks[key], rect, renderer)
+                baked = True
+        self.dirty.clear()
+
+        self.evict(view)
+
+        # baking changes the projection, so point it back at the camera
+        if baked:
+            if view is not None:
+                renderer.setProjectionMatrix(view)
+            else:
+                renderer.setProjectionMatrix(0, 0, self.width * self.tile_size[0], self.height * self.tile_size[1])
+
+        with self.profiler.section("GameMap.draw"):
+            for key in visible:
+                chunk = self.chunks[key]
+                self.chunks.move_to_end(key)
+                renderer.render(chunk.rt.buffers[0], [0, 0, chunk.px_wide, chunk.px_high],
+                                chunk.x * self.tile_size[0], chunk.y * self.tile_size[1],
+                                chunk.px_wide, chunk.px_high, 0)
+
+    def chunks_in(self, view, margin: int) -> list[Tuple[int, int]]:
+        """ The chunks that overlap a view, grown by a margin of chunks on each side """
+        if view is None:
+            return [(cx, cy) for cy in range(self.chunk_rows) for cx in range(self.chunk_columns)]
+
+        x0 = max(int(view.min_x // self.chunk_px[0]) - margin, 0)
+        y0 = max(int(view.min_y // self.chunk_px[1]) - margin, 0)
+        x1 = min(int(view.max_x // self.chunk_px[0]) + margin, self.chunk_columns - 1)
+        y1 = min(int(view.max_y // self.chunk_px[1]) + margin, self.chunk_rows - 1)
+        return [(cx, cy) for cy in range(y0, y1 + 1) for cx in range(x0, x1 + 1)]
+
+    def evict(self, view) -> None:
+        """ Frees the least recently drawn chunks that are outside the margin around the view """
+        if len(self.chunks) <= MAX_CHUNKS:
+            return
+
+        keep = set(self.chunks_in(view, CHUNK_MARGIN))
+        for key in list(self.chunks):
+            if len(self.chunks) <= MAX_CHUNKS:
+                break
+            if key not in keep:
+                del self.chunks[key]
+
+    def blit(self, key: Tuple[int, int], renderer: pyasge.Renderer) -> None:
+        """ Renders a chunk of the game world in to its own texture """
+        with self.profiler.section("GameMap.blit"):
+            x = key[0] * CHUNK_TILES
+            y = key[1] * CHUNK_TILES
+            chunk = MapChunk(renderer, x, y,
+                             min(CHUNK_TILES, self.width - x), min(CHUNK_TILES, self.height - y), self.tile_size)
+
+            self.draw_tiles(chunk, (chunk.x, chunk.y, chunk.x + chunk.width - 1, chunk.y + chunk.height - 1), renderer)
+            self.chunks[key] = chunk
+
+    def draw_tiles(self, chunk: MapChunk, rect: Tuple[int, int, int, int], renderer: pyasge.Renderer) -> None:
+        """ Renders the tiles inside an inclusive (x0, y0, x1, y1) rect in to a chunk and resolves it once """
+        renderer.setRenderTarget(chunk.rt)
+        renderer.setProjectionMatrix(0, 0, chunk.px_wide, chunk.px_high)
+        renderer.setViewport(pyasge.Viewport(0, 0, chunk.px_wide, chunk.px_high))
+
+        for gids in self.layers.values():
+            rows = gids[rect[1]:rect[3] + 1, rect[0]:rect[2] + 1].tolist()
+            for row_index, row in enumerate(rows, rect[1]):
+                for col_index, gid in enumerate(row, rect[0]):
+                    tile = self.gid_tiles[gid]
                     if tile:
                         renderer.render(tile,
-                                        col_index * self.tile_size[0],
-                                        row_index * self.tile_size[1])
+                                        (col_index - chunk.x) * self.tile_size[0],
+                                        (row_index - chunk.y) * self.tile_size[1])
 
         renderer.setRenderTarget(None)
         renderer.setViewport(pyasge.Viewport(0, 0, 1920, 1080))
-        self.rt.resolve()
-        self.redraw = False
+        chunk.rt.resolve()
@@ -0,0 +1,208 @@
+"""
+A precompiled, memory-mappable copy of a TMX map.
+
+Parsing the TMX means XML, CSV and pytmx's own bookkeeping on every
+launch. The compiler does that once and writes the results next to the
+map as raw arrays behind a small JSON header. Later launches map the
+arrays straight in to memory, as long as the content hash of the map,
+its tilesets and their images still matches.
+
+Run from the repository root to (re)compile a map ahead of time:
+
+    python -m game.gameobjects.mapcache ./data/worldmap.tmx
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+from game.gameobjects.mapdata import MapData
+
+MAGIC = b"PGMAP001"
+VERSION = 2
+ALIGN = 64
+SUFFIX = ".mapcache"
+
+SOURCES = re.compile(rb'source="([^"]+)"')
+
+
+def cache_path(filename: str) -> str:
+    return filename + SUFFIX
+
+
+def dependencies(filename: str) -> list[str]:
+    """ The map file and every tileset and image it pulls in, found without parsing the XML """
+    found = [os.path.normpath(filename)]
+    for path in found:
+        if path.endswith((".tmx", ".tsx")):
+            with open(path, "rb") as file:
+                for source in SOURCES.findall(file.read()):
+                    source = os.path.normpath(os.path.join(os.path.dirname(path), source.decode()))
+                    if source not in found:
+                        found.append(source)
+    return found
+
+
+def content_hash(filename: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(VERSION.to_bytes(4, "little"))
+    for path in dependencies(filename):
+        digest.update(path.encode())
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def write_arrays(path: str, header: dict, arrays: dict) -> None:
+    """
+    Writes a JSON header and a set of arrays out as an aligned binary file
+
+    The header gains an "arrays" entry with the offset, dtype and shape of
+    each array. The file is written under a temporary name and then moved
+    in to place, so a crash part way through never leaves a broken file.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    header["arrays"] = {}
+
+    # the header holds the offsets, so grow the space for it until they fit
+    start = 0
+    while True:
+        offset = start
+        for name, array in arrays.items():
+            header["arrays"][name] = [offset, array.dtype.str, list(array.shape)]
+            offset = _align(offset + array.nbytes)
+
+        encoded = json.dumps(header).encode()
+        needed = _align(len(MAGIC) + 4 + len(encoded))
+        if needed <= start:
+            break
+        start = needed
+
+    temp = path + ".tmp"
+    with open(temp, "wb") as file:
+        file.write(MAGIC)
+        file.write(len(encoded).to_bytes(4, "little"))
+        file.write(encoded)
+        for name, array in arrays.items():
+            file.seek(header["arrays"][name][0])
+            file.write(array.tobytes())
+    os.replace(temp, path)
+
+
+def map_arrays(path: str, digest: str):
+    """
+    Maps a file written by `write_arrays` in to memory
+
+    Arrays are only paged in from disk as they're read, and are mapped
+    copy-on-write, so the game can edit them without touching the file.
+
+    Returns:
+        Tuple[dict, Callable]: The header and a function returning an array by name,
+        or None if there's no file, its hash doesn't match or it's been cut short
+    """
+    try:
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                return None
+            length = int.from_bytes(file.read(4), "little")
+            header = json.loads(file.read(length))
+
+        if header["hash"] != digest:
+            return None
+
+        # a truncated file can still have a matching hash, so check every array fits
+        raw = np.memmap(path, dtype=np.uint8, mode="c")
+        for offset, dtype, shape in header["arrays"].values():
+            if offset < 0 or offset + int(np.prod(shape)) * np.dtype(dtype).itemsize > raw.size:
+                return None
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+    def array(name: str) -> np.ndarray:
+        offset, dtype, shape = header["arrays"][name]
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        return raw[offset:offset + count * dtype.itemsize].view(dtype).reshape(shape)
+
+    return header, array
+
+
+def write_cache(filename: str, data: MapData, digest: str) -> None:
+    """ Writes a map's data out next to its TMX file """
+    arrays = {"layer:" + name: gids for name, gids in data.layers.items()}
+    arrays.update(costs=data.costs, islands=data.islands, spawns=data.spawns,
+                  tiles=data.tiles, tiled_gids=data.tiled_gids)
+    header = {
+        "hash": digest,
+        "width": data.width,
+        "height": data.height,
+        "tile_size": list(data.tile_size),
+        "layers": list(data.layers),
+        "layer_costs": data.layer_costs,
+        "tilesets": [os.path.relpath(path, os.path.dirname(filename)) for path in data.tilesets],
+    }
+    write_arrays(cache_path(filename), header, arrays)
+
+
+def read_cache(filename: str, digest: str):
+    """
+    Maps a compiled map in to memory
+
+    Returns:
+        MapData: The map, or None if there's no cache, it's out of date or it's corrupt
+    """
+    mapped = map_arrays(cache_path(filename), digest)
+    if mapped is None:
+        return None
+
+    header, array = mapped
+    try:
+        return MapData(header["width"], header["height"], tuple(header["tile_size"]),
+                       {name: array("layer:" + name) for name in header["layers"]}, header["layer_costs"],
+                       array("costs"), array("islands"), array("spawns"),
+                       [os.path.normpath(os.path.join(os.path.dirname(filename), path)) for path in header["tilesets"]],
+                       array("tiles"), array("tiled_gids"))
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def compile_map(filename: str) -> MapData:
+    """ Parses a TMX file and writes its cache, returning the parsed data """
+    data = MapData.from_tmx(filename)
+    write_cache(filename, data, content_hash(filename))
+    return data
+
+
+def load_map(filename: str) -> MapData:
+    """
+    Loads a map from its cache, falling back to parsing the TMX
+
+    A cache that is missing or out of date is rebuilt for next time. If
+    it can't be written, e.g. on a read-only install, the parsed map is
+    still returned.
+    """
+    digest = content_hash(filename)
+    data = read_cache(filename, digest)
+    if data is not None:
+        return data
+
+    data = MapData.from_tmx(filename)
+    try:
+        write_cache(filename, data, digest)
+    except OSError:
+        pass
+    return data
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+if __name__ == "__main__":
+    for tmx in sys.argv[1:] or ["./data/worldmap.tmx"]:
+        compile_map(tmx)
+        print(f"{tmx} -> {cache_path(tmx)} ({os.path.getsize(cache_path(tmx))} bytes)")
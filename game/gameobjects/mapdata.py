@@ -0,0 +1,98 @@
+"""
+Renderer-free helpers for reading map data out of a TMX file.
+
+Everything here works on the parsed TMX alone, so tools, benchmarks and
+tests can build the same cost grid as the game without a window, GPU
+or audio device.
+"""
+
+import os
+from typing import Tuple
+
+import numpy as np
+import pytmx
+from pytmx import TiledTileLayer
+
+
+def read_layers(tmxdata) -> Tuple[dict, np.ndarray]:
+    """
+    Reads every visible tile layer's gids and sums their costs
+
+    Args:
+        tmxdata (pytmx.TiledMap): The parsed map
+
+    Returns:
+        Tuple[dict, np.ndarray]: The gid array for each layer name and the summed cost grid
+    """
+    layers = {}
+    costs = np.zeros((tmxdata.height, tmxdata.width), dtype=np.int32)
+    for layer in tmxdata.visible_layers:
+        if isinstance(layer, TiledTileLayer):
+            layers[layer.name] = np.array(layer.data, dtype=np.int32)
+
+            # every occupied cell in the layer adds the layer's cost
+            costs += np.where(layers[layer.name] != 0, layer.properties["cost"], 0).astype(np.int32)
+
+    return layers, costs
+
+
+class MapData:
+
+    """
+    Everything the game needs from a TMX file, without any pytmx objects
+
+    Tile images are described by the `tiles` table rather than loaded,
+    one row per gid as stored in `layers`: the tileset image index (-1 for gids with no
+    image), the source rect, and the horizontal, vertical and diagonal
+    flip flags. `tiled_gids` maps each pytmx gid back to the gid Tiled
+    wrote in the file, which is the same for every flipped copy.
+
+    Streamed maps also carry the ChunkStore their layers read from.
+    """
+    def __init__(self, width: int, height: int, tile_size: Tuple[int, int], layers: dict, layer_costs: dict,
+                 costs: np.ndarray, islands: np.ndarray, spawns: np.ndarray, tilesets: list, tiles: np.ndarray,
+                 tiled_gids: np.ndarray, store=None):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.layers = layers
+        self.layer_costs = layer_costs
+        self.costs = costs
+        self.islands = islands
+        self.spawns = spawns
+        self.tilesets = tilesets
+        self.tiles = tiles
+        self.tiled_gids = tiled_gids
+        self.store = store
+
+    @classmethod
+    def from_tmx(cls, filename: str) -> "MapData":
+        """ Parses a TMX file with pytmx, recording where each tile's image comes from """
+        tilesets = []
+
+        def record_image(path, colorkey, **kwargs):
+            path = os.path.normpath(path)
+            if path not in tilesets:
+                tilesets.append(path)
+            tileset = tilesets.index(path)
+            return lambda rect, flags: (tileset, *rect, *flags)
+
+        tmxdata = pytmx.TiledMap(filename, image_loader=record_image)
+        layers, costs = read_layers(tmxdata)
+        layer_costs = {layer.name: layer.properties["cost"] for layer in tmxdata.visible_layers
+                       if isinstance(layer, TiledTileLayer)}
+
+        tiles = np.full((len(tmxdata.images), 8), -1, dtype=np.int32)
+        tiled_gids = np.zeros(len(tmxdata.images), dtype=np.int32)
+        for gid, image in enumerate(tmxdata.images):
+            if image:
+                tiles[gid] = image
+                tiled_gids[gid] = tmxdata.tiledgidmap[gid]
+
+        islands = np.array([[rect.x, rect.y, rect.width, rect.height] for rect in tmxdata.layernames["NoGo"]],
+                           dtype=np.float64).reshape(-1, 4)
+        spawns = np.array([[obj.x, obj.y] for obj in tmxdata.layernames["Spawns"]],
+                          dtype=np.float64).reshape(-1, 2)
+
+        return cls(tmxdata.width, tmxdata.height, (tmxdata.tilewidth, tmxdata.tileheight), layers, layer_costs, costs,
+                   islands, spawns, tilesets, tiles, tiled_gids)
@@ -0,0 +1,429 @@
+"""
+Streaming for Tiled's infinite, chunked maps.
+
+pytmx refuses infinite maps, so these are read straight from the XML by
+a compiler that re-blocks every layer in to fixed size blocks of tiles
+and writes them, indexed by block, in to one memory-mapped file next to
+the map. At runtime a ChunkStore pages blocks in as they're needed and
+keeps a bounded number resident, while a worker thread loads the blocks
+ahead of the player before the camera reaches them.
+
+The summed costs, islands and spawns are small next to the tile layers,
+so they're kept whole and can be queried anywhere on the map.
+
+Run from the repository root to (re)compile a map ahead of time:
+
+    python -m game.gameobjects.mapstream ./data/ocean.tmx
+"""
+
+import base64
+import gzip
+import os
+import queue
+import re
+import sys
+import threading
+import xml.etree.ElementTree as ElementTree
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from game.gameobjects.mapcache import content_hash, map_arrays, write_arrays
+from game.gameobjects.mapdata import MapData
+
+BLOCK_TILES = 16
+RESIDENT_BLOCKS = 64
+PREFETCH_BLOCKS = 2
+SUFFIX = ".stream"
+
+# the top bits of a gid in the file say how the tile is flipped
+FLIPPED_HORIZONTALLY = 0x80000000
+FLIPPED_VERTICALLY = 0x40000000
+FLIPPED_DIAGONALLY = 0x20000000
+GID_MASK = 0x0FFFFFFF
+
+INFINITE = re.compile(rb'<map\s[^>]*infinite="1"')
+
+
+def stream_path(filename: str) -> str:
+    return filename + SUFFIX
+
+
+def is_infinite(filename: str) -> bool:
+    with open(filename, "rb") as file:
+        return INFINITE.search(file.read(4096)) is not None
+
+
+def _decode(text: str, encoding: Optional[str], compression: Optional[str]) -> np.ndarray:
+    """ Decodes a layer's or chunk's data in to raw gids """
+    if encoding == "csv":
+        return np.array([int(value) for value in text.split(",") if value.strip()], dtype=np.uint32)
+
+    if encoding == "base64":
+        raw = base64.b64decode(text.strip())
+        if compression == "zlib":
+            raw = zlib.decompress(raw)
+        elif compression == "gzip":
+            raw = gzip.decompress(raw)
+        elif compression:
+            raise ValueError(f"unsupported tile layer compression: {compression}")
+        return np.frombuffer(raw, dtype="<u4").astype(np.uint32)
+
+    raise ValueError(f"unsupported tile layer encoding: {encoding}")
+
+
+def _tilesets(root, directory: str) -> list:
+    """ The first gid, image and tile grid of every tileset, sorted by first gid """
+    tilesets = []
+    for node in root.findall("tileset"):
+        firstgid = int(node.get("firstgid"))
+        base = directory
+        if node.get("source"):
+            source = os.path.join(directory, node.get("source"))
+            node = ElementTree.parse(source).getroot()
+            base = os.path.dirname(source)
+
+        tilesets.append((
+            firstgid,
+            os.path.normpath(os.path.join(base, node.find("image").get("source"))),
+            int(node.get("tilewidth")), int(node.get("tileheight")), int(node.get("columns")),
+            int(node.get("margin", 0)), int(node.get("spacing", 0))))
+
+    return sorted(tilesets)
+
+
+def _chunks(node, width: int, height: int):
+    """ Yields the x, y and 2D raw gids of each chunk in a layer, a finite layer is one chunk """
+    data = node.find("data")
+    encoding = data.get("encoding")
+    compression = data.get("compression")
+    chunks = data.findall("chunk")
+    if not chunks:
+        yield 0, 0, _decode(data.text, encoding, compression).reshape(height, width)
+
+    for chunk in chunks:
+        gids = _decode(chunk.text, encoding, compression)
+        yield int(chunk.get("x")), int(chunk.get("y")), gids.reshape(int(chunk.get("height")), int(chunk.get("width")))
+
+
+def build_stream(filename: str, digest: str) -> Tuple[dict, dict]:
+    """
+    Reads a TMX file in to block-indexed arrays
+
+    The map is shifted so its top-left block starts at tile (0, 0), as
+    infinite maps can have chunks at negative coordinates.
+
+    Returns:
+        Tuple[dict, dict]: The header and the arrays to write with it
+    """
+    root = ElementTree.parse(filename).getroot()
+    tile_size = (int(root.get("tilewidth")), int(root.get("tileheight")))
+    tilesets = _tilesets(root, os.path.dirname(filename))
+
+    layers = []
+    for node in root.findall("layer"):
+        if node.get("visible") == "0":
+            continue
+
+        cost = 0
+        for prop in node.iter("property"):
+            if prop.get("name") == "cost":
+                cost = int(prop.get("value"))
+        layers.append((node.get("name"), cost, list(_chunks(node, int(root.get("width")), int(root.get("height"))))))
+
+    # the bounds of every chunk, grown out to whole blocks
+    chunks = [chunk for layer in layers for chunk in layer[2]]
+    left = min(x for x, y, gids in chunks) // BLOCK_TILES * BLOCK_TILES
+    top = min(y for x, y, gids in chunks) // BLOCK_TILES * BLOCK_TILES
+    width = max(x + gids.shape[1] for x, y, gids in chunks) - left
+    height = max(y + gids.shape[0] for x, y, gids in chunks) - top
+
+    # give every (gid, flags) pair in use a compact id, 0 stays empty
+    raw_gids = np.unique(np.concatenate([gids.ravel() for x, y, gids in chunks] + [np.zeros(1, np.uint32)]))
+    tiles = np.full((len(raw_gids), 8), -1, dtype=np.int32)
+    tiled_gids = (raw_gids & GID_MASK).astype(np.int32)
+    for gid, raw in enumerate(raw_gids.tolist()):
+        if not tiled_gids[gid]:
+            continue
+
+        index = max(i for i, tileset in enumerate(tilesets) if tileset[0] <= tiled_gids[gid])
+        firstgid, image, tile_width, tile_height, columns, margin, spacing = tilesets[index]
+        local = int(tiled_gids[gid]) - firstgid
+        tiles[gid] = (index,
+                      margin + local % columns * (tile_width + spacing),
+                      margin + local // columns * (tile_height + spacing),
+                      tile_width, tile_height,
+                      bool(raw & FLIPPED_HORIZONTALLY), bool(raw & FLIPPED_VERTICALLY), bool(raw & FLIPPED_DIAGONALLY))
+
+    # copy each chunk in to the blocks it overlaps, summing costs as it goes
+    blocks = {}
+    costs = np.zeros((height, width), dtype=np.int32)
+    for index, (name, cost, layer_chunks) in enumerate(layers):
+        for x, y, gids in layer_chunks:
+            ids = np.searchsorted(raw_gids, gids).astype(np.int32)
+            x -= left
+            y -= top
+            costs[y:y + ids.shape[0], x:x + ids.shape[1]] += np.where(ids != 0, cost, 0).astype(np.int32)
+
+            for by in range(y // BLOCK_TILES, (y + ids.shape[0] - 1) // BLOCK_TILES + 1):
+                for bx in range(x // BLOCK_TILES, (x + ids.shape[1] - 1) // BLOCK_TILES + 1):
+                    x0 = max(x, bx * BLOCK_TILES)
+                    y0 = max(y, by * BLOCK_TILES)
+                    x1 = min(x + ids.shape[1], (bx + 1) * BLOCK_TILES)
+                    y1 = min(y + ids.shape[0], (by + 1) * BLOCK_TILES)
+                    part = ids[y0 - y:y1 - y, x0 - x:x1 - x]
+                    if not part.any():
+                        continue
+
+                    if (bx, by) not in blocks:
+                        blocks[(bx, by)] = np.zeros((len(layers), BLOCK_TILES, BLOCK_TILES), dtype=np.int32)
+                    blocks[(bx, by)][index, y0 - by * BLOCK_TILES:y1 - by * BLOCK_TILES,
+                                     x0 - bx * BLOCK_TILES:x1 - bx * BLOCK_TILES] = part
+
+    islands = []
+    spawns = []
+    for group in root.findall("objectgroup"):
+        for obj in group.findall("object"):
+            x = float(obj.get("x")) - left * tile_size[0]
+            y = float(obj.get("y")) - top * tile_size[1]
+            if group.get("name") == "NoGo":
+                islands.append([x, y, float(obj.get("width", 0)), float(obj.get("height", 0))])
+            elif group.get("name") == "Spawns":
+                spawns.append([x, y])
+
+    header = {
+        "hash": digest,
+        "width": width,
+        "height": height,
+        "origin": [left, top],
+        "tile_size": list(tile_size),
+        "block": BLOCK_TILES,
+        "blocks": [list(key) for key in blocks],
+        "cells": int(sum(np.count_nonzero(block) for block in blocks.values())),
+        "layers": [layer[0] for layer in layers],
+        "layer_costs": {layer[0]: layer[1] for layer in layers},
+        "tilesets": [os.path.relpath(tileset[1], os.path.dirname(filename)) for tileset in tilesets],
+    }
+    arrays = {
+        "costs": costs,
+        "islands": np.array(islands, dtype=np.float64).reshape(-1, 4),
+        "spawns": np.array(spawns, dtype=np.float64).reshape(-1, 2),
+        "tiles": tiles,
+        "tiled_gids": tiled_gids,
+    }
+    arrays.update({"block:%d,%d" % key: block for key, block in blocks.items()})
+    return header, arrays
+
+
+class ChunkStore:
+
+    """
+    The resident blocks of a streamed map
+
+    Blocks are paged in from the memory-mapped file the first time
+    they're read and the least recently used are dropped once more than
+    `capacity` are resident. Blocks edited at runtime are held on to, so
+    edits are never lost to an eviction.
+
+    Args:
+        header (dict): The stream file's header
+        array (Callable): Returns one of the file's arrays by name
+        capacity (int): The most unedited blocks to keep resident
+    """
+
+    def __init__(self, header: dict, array, capacity: int = RESIDENT_BLOCKS) -> None:
+        self.array = array
+        self.width = header["width"]
+        self.height = header["height"]
+        self.origin = tuple(header["origin"])
+        self.block_tiles = header["block"]
+        self.layer_count = len(header["layers"])
+        self.cells = header["cells"]
+        self.stored = {tuple(key) for key in header["blocks"]}
+        self.capacity = capacity
+
+        self.resident = OrderedDict()
+        self.edited = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+        self.requests = queue.Queue()
+        self.queued = set()
+        self.worker = None
+
+    def block(self, key: Tuple[int, int]) -> Optional[np.ndarray]:
+        """ The (layers, rows, columns) gids of a block, or None if the block is empty """
+        with self.lock:
+            block = self.edited.get(key)
+            if block is None:
+                block = self.resident.get(key)
+                if block is not None:
+                    self.resident.move_to_end(key)
+            if block is not None:
+                self.hits += 1
+                return block
+
+        if key not in self.stored:
+            return None
+
+        # copying pages the block in from disk now, rather than when it's drawn
+        block = np.array(self.array("block:%d,%d" % key))
+        with self.lock:
+            self.loads += 1
+            self.resident[key] = block
+            while len(self.resident) > self.capacity:
+                self.resident.popitem(last=False)
+                self.evictions += 1
+        return block
+
+    def read(self, layer: int, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """ Copies out the gids of a layer in the rect from (x0, y0) up to, but not including, (x1, y1) """
+        size = self.block_tiles
+        gids = np.zeros((max(y1 - y0, 0), max(x1 - x0, 0)), dtype=np.int32)
+        for by in range(y0 // size, (y1 - 1) // size + 1):
+            for bx in range(x0 // size, (x1 - 1) // size + 1):
+                block = self.block((bx, by))
+                if block is None:
+                    continue
+
+                left = max(x0, bx * size)
+                top = max(y0, by * size)
+                right = min(x1, (bx + 1) * size)
+                bottom = min(y1, (by + 1) * size)
+                gids[top - y0:bottom - y0, left - x0:right - x0] = \
+                    block[layer, top - by * size:bottom - by * size, left - bx * size:right - bx * size]
+        return gids
+
+    def write(self, layer: int, x: int, y: int, gid: int) -> None:
+        """ Changes one gid, pinning its block in memory """
+        key = (x // self.block_tiles, y // self.block_tiles)
+        block = self.block(key)
+        if block is None:
+            block = np.zeros((self.layer_count, self.block_tiles, self.block_tiles), dtype=np.int32)
+
+        with self.lock:
+            self.edited[key] = block
+            self.resident.pop(key, None)
+        block[layer, y % self.block_tiles, x % self.block_tiles] = gid
+
+    def prefetch(self, keys) -> None:
+        """ Queues blocks to be paged in by the worker thread """
+        for key in keys:
+            with self.lock:
+                if key not in self.stored or key in self.queued or key in self.resident or key in self.edited:
+                    continue
+                self.queued.add(key)
+            self.requests.put(key)
+
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._prefetch_worker, name="map-prefetch", daemon=True)
+            self.worker.start()
+
+    def _prefetch_worker(self) -> None:
+        while True:
+            key = self.requests.get()
+            self.block(key)
+            with self.lock:
+                self.queued.discard(key)
+
+
+class StreamedLayer:
+
+    """
+    One tile layer of a streamed map, indexed like a 2D gid array
+
+    Supports single cells (`layer[y, x]`, read and write) and reading
+    rects with step-less slices (`layer[y0:y1, x0:x1]`). Converting it
+    with np.asarray reads the whole layer.
+    """
+
+    def __init__(self, store: ChunkStore, index: int) -> None:
+        self.store = store
+        self.index = index
+        self.shape = (store.height, store.width)
+        self.dtype = np.dtype(np.int32)
+
+    def __getitem__(self, key) -> np.ndarray:
+        y, x = key
+        if isinstance(y, slice) or isinstance(x, slice):
+            y0, y1 = self._span(y, self.shape[0])
+            x0, x1 = self._span(x, self.shape[1])
+            return self.store.read(self.index, x0, y0, x1, y1)
+
+        return self.store.read(self.index, x, y, x + 1, y + 1)[0, 0]
+
+    def __setitem__(self, key, gid: int) -> None:
+        y, x = key
+        self.store.write(self.index, x, y, gid)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        gids = self.store.read(self.index, 0, 0, self.shape[1], self.shape[0])
+        return gids if dtype is None else gids.astype(dtype)
+
+    @staticmethod
+    def _span(index, size: int) -> Tuple[int, int]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(size)
+            if step != 1:
+                raise IndexError("streamed layers can't be sliced with a step")
+            return start, stop
+        return index, index + 1
+
+
+def gather(layer, tiles: np.ndarray) -> np.ndarray:
+    """ The gids of many tiles in a layer, whole or streamed, given an (n, 2) array of their x and y """
+    if isinstance(layer, StreamedLayer):
+        # streamed layers page their blocks in one tile at a time
+        return np.array([layer[y, x] for x, y in tiles.tolist()], dtype=np.int32)
+    return layer[tiles[:, 1], tiles[:, 0]]
+
+
+def compile_stream(filename: str) -> Tuple[dict, dict]:
+    """ Reads a TMX file and writes its stream file, returning the header and arrays """
+    header, arrays = build_stream(filename, content_hash(filename))
+    write_arrays(stream_path(filename), header, arrays)
+    return header, arrays
+
+
+def load_stream(filename: str, capacity: int = RESIDENT_BLOCKS) -> MapData:
+    """
+    Opens a map for streaming, compiling it first if it's new or has changed
+
+    If the stream file can't be written, e.g. on a read-only install, the
+    compiled blocks are kept in memory instead.
+    """
+    digest = content_hash(filename)
+    mapped = map_arrays(stream_path(filename), digest)
+    if mapped is not None:
+        try:
+            return _open_stream(filename, *mapped, capacity)
+        except (ValueError, TypeError, KeyError):
+            pass
+
+    header, arrays = build_stream(filename, digest)
+    try:
+        write_arrays(stream_path(filename), header, arrays)
+        mapped = map_arrays(stream_path(filename), digest)
+    except OSError:
+        mapped = None
+    return _open_stream(filename, *(mapped or (header, arrays.__getitem__)), capacity)
+
+
+def _open_stream(filename: str, header: dict, array, capacity: int) -> MapData:
+    store = ChunkStore(header, array, capacity)
+    return MapData(header["width"], header["height"], tuple(header["tile_size"]),
+                   {name: StreamedLayer(store, index) for index, name in enumerate(header["layers"])},
+                   header["layer_costs"], array("costs"), array("islands"), array("spawns"),
+                   [os.path.normpath(os.path.join(os.path.dirname(filename), path)) for path in header["tilesets"]],
+                   array("tiles"), array("tiled_gids"), store)
+
+
+if __name__ == "__main__":
+    for tmx in sys.argv[1:]:
+        compiled = compile_stream(tmx)[0]
+        print(f"{tmx} -> {stream_path(tmx)} ({len(compiled['blocks'])} blocks, "
+              f"{os.path.getsize(stream_path(tmx))} bytes)")
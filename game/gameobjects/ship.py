@@ -1,9 +1,9 @@
-import math
 import pyasge
 from abc import ABC, abstractmethod
 
 from game.fsm import FSM
 from game.shipcondition import ShipCondition
+from game.simulation import ShipState
 from tasks.task1_shipstates import update_healthy, update_damaged, update_very_damaged, deaded
 
 
@@ -13,18 +13,18 @@ class Ship(ABC):
 
     This includes both the enemy and the player. Ideally any
     code that is required for both derived classes should be
-    stored here instead.
+    stored here instead. How a ship moves is simulated on its
+    `state`, and the ship keeps the sprites that draw it.
     """
 
     def __init__(self):
         # used for drawing the frames
         self.frames = []
+        self.frame_textures = []
         self.active_frame = None
 
         # current and destination
-        self.position = pyasge.Point2D(0, 0)
-        self.destination = [pyasge.Point2D(0, 0)]
-        self.direction = pyasge.Point2D(0, 0)
+        self.state = ShipState()
 
         # set the initial state
         self.prev_ship_condition = ShipCondition.HEALTHY
@@ -43,6 +43,27 @@ class Ship(ABC):
     def render(self, renderer: pyasge.Renderer, game_time: pyasge.GameTime):
         pass
 
+    def reset(self) -> None:
+        """Returns the ship to full health, keeping its sprites"""
+        self.hp = 10
+        self.prev_ship_condition = ShipCondition.HEALTHY
+        self.ship_condition = ShipCondition.HEALTHY
+        self.fsm.setstate(self.update_healthy)
+        self.active_frame = self.frames[0]
+        self.rotation = 0
+        self.direction = pyasge.Point2D(0, 0)
+        self.destination = [self.position]
+
+    def sync(self) -> None:
+        """Moves the active frame to match the ship's state, ready to be drawn"""
+        state = self.state
+        frame = self.active_frame
+        frame.x = state.x
+        frame.y = state.y
+        frame.rotation = state.rotation
+        frame.width = state.width
+        frame.height = state.height
+
     def redraw(self) -> None:
         """Redraws the ship based on its current condition"""
         if self.ship_condition != self.prev_ship_condition:
@@ -51,27 +72,13 @@ class Ship(ABC):
             self.prev_ship_condition = self.ship_condition
 
     def set_sail(self, path: list[pyasge.Point2D]) -> None:
-        """Updates the ship's destination route"""
-        self.destination = path
-
-        for path in self.destination:
-            path.x -= self.width * 0.5
-            path.y -= self.height * 0.5
-
+        """Updates the ship's destination route, the points its middle should pass through"""
+        self.state.route = [[point.x - self.width * 0.5, point.y - self.height * 0.5] for point in path]
         self.rotate()
 
     def rotate(self) -> None:
         """Orientate the ship depending on its direction"""
-        if len(self.destination):
-            if self.destination[0] == self.position:
-                return
-
-            # direction becomes target - current position normalised
-            self.direction.x = self.destination[0].x - self.x
-            self.direction.y = self.destination[0].y - self.y
-            normalise = math.sqrt(self.direction.x * self.direction.x + self.direction.y * self.direction.y)
-            self.direction.x /= normalise
-            self.direction.y /= normalise
+        self.state.head_for_route()
 
     # These functions will call your brain FSM implementations from task 1
     def update_healthy(self, game_time: pyasge.GameTime):
@@ -86,65 +93,95 @@ class Ship(ABC):
     def deaded(self, game_time: pyasge.GameTime):
         deaded(self, game_time)
 
+    @property
+    def bounds(self) -> tuple:
+        """The axis aligned box around the rotated ship, as min x, min y, max x and max y"""
+        return self.state.bounds()
+
+    @property
+    def destination(self) -> list[pyasge.Point2D]:
+        return [pyasge.Point2D(x, y) for x, y in self.state.route]
+
+    @destination.setter
+    def destination(self, value: list[pyasge.Point2D]) -> None:
+        self.state.route = [[point.x, point.y] for point in value]
+
+    @property
+    def direction(self) -> pyasge.Point2D:
+        return pyasge.Point2D(self.state.direction_x, self.state.direction_y)
+
+    @direction.setter
+    def direction(self, value: pyasge.Point2D) -> None:
+        self.state.direction_x = value.x
+        self.state.direction_y = value.y
+
     @property
     def height(self) -> float:
-        return self.active_frame.height
+        return self.state.height
 
     @height.setter
     def height(self, value: float) -> None:
-        for frame in self.frames:
-            frame.height = value
+        self.state.height = value
+
+    @property
+    def hp(self) -> int:
+        return self.state.hp
+
+    @hp.setter
+    def hp(self, value: int) -> None:
+        self.state.hp = value
+
+    @property
+    def texture(self) -> str:
+        """The texture of the active frame, used to batch draws"""
+        return self.frame_textures[self.frames.index(self.active_frame)]
 
     @property
     def midpoint(self) -> pyasge.Point2D:
-        return self.active_frame.midpoint
+        return pyasge.Point2D(*self.state.midpoint())
 
     @property
     def position(self) -> pyasge.Point2D:
-        return pyasge.Point2D(self.active_frame.x, self.active_frame.y)
+        return pyasge.Point2D(self.state.x, self.state.y)
 
     @position.setter
     def position(self, value: pyasge.Point2D) -> None:
-        for frame in self.frames:
-            frame.x = value.x
-            frame.y = value.y
+        self.state.x = value.x
+        self.state.y = value.y
 
     @property
     def rotation(self) -> float:
-        return self.active_frame.rotation
+        return self.state.rotation
 
     @rotation.setter
     def rotation(self, value: float) -> None:
-        for frame in self.frames:
-            frame.rotation = value
+        self.state.rotation = value
 
     @property
     def width(self) -> float:
-        return self.active_frame.width
+        return self.state.width
 
     @width.setter
     def width(self, value: float) -> None:
-        for frame in self.frames:
-            frame.width = value
+        self.state.width = value
 
     @property
     def world_bounds(self):
+        self.sync()
         return self.active_frame.getWorldBounds()
 
     @property
     def x(self):
-        return self.active_frame.x
+        return self.state.x
 
     @x.setter
     def x(self, value):
-        for frame in self.frames:
-            frame.x = value
+        self.state.x = value
 
     @property
     def y(self):
-        return self.active_frame.y
+        return self.state.y
 
     @y.setter
     def y(self, value):
-        for frame in self.frames:
-            frame.y = value
+        self.state.y = value
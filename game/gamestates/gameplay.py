@@ -1,16 +1,21 @@
 import math
-import random
 
 import pyasge
 from pyfmodex.flags import MODE
 
-from game.gameobjects.cannonball import Cannonball
+from game.gameobjects.cannonball import CannonballPool, CANNONBALL_TEXTURE
+from game.gameobjects.player import Player
 from game.shipcondition import ShipCondition
 from tasks.task4_enemy import Enemy
 from game.gamedata import GameData
 from game.gamestates.gamestate import GameState
 from game.gamestates.gamestate import GameStateID
-from tasks.task3_pathfinding import resolve
+from game.pathfinding.scheduler import PathScheduler
+from game.renderqueue import RenderQueue
+from game.simulation import HIT, MISS, SUNK, Simulation
+from tasks.task3_pathfinding import request_route
+
+UI_ENEMY_ICON = "./data/sprites/ships/ship (4).png"
 
 
 class GamePlay(GameState):
@@ -23,6 +28,9 @@ class GamePlay(GameState):
     GAME_WON when the end game state is reached.
     """
 
+    # every texture the state uses, so they're all loaded before play starts
+    ASSETS = Player.FRAMES + Enemy.FRAMES + [CANNONBALL_TEXTURE, UI_ENEMY_ICON]
+
     def __init__(self, data: GameData) -> None:
         """ Creates the game world
 
@@ -37,13 +45,17 @@ class GamePlay(GameState):
 
         self.id = GameStateID.GAMEPLAY
         self.debug = True
-        self.data.renderer.setClearColour((201 / 255, 236 / 255, 251 / 255))
 
-        # gameplay data
-        self.cannonballs = []
-        self.reset_player()
+        # gameplay data, the ships and cannonballs are views over the simulation
+        self.simulation = Simulation.from_map(self.data.game_map)
+        self.paths = PathScheduler(self.data.game_map)
+        self.player_route = None
+        self.cannonballs = CannonballPool(self.data.assets, self.simulation.projectiles)
+        self.render_queue = RenderQueue()
         self.enemies = []
-        self.spawn_enemies()
+
+        # the ships in the order they were added to the simulation
+        self.ships = []
 
         # ui elements
         self.ui_score = None
@@ -54,12 +66,13 @@ class GamePlay(GameState):
         self.debug_player_rotation = None
         self.debug_player_tile = None
         self.debug_player_pos = None
+        self.debug_render_queue = None
+        self.debug_profile = []
         self.init_debug_text()
 
         # sets up the camera and points it at the player
         self.camera = pyasge.Camera([0, 0], self.data.game_res[0], self.data.game_res[1])
         self.camera.zoom = 1
-        self.camera.lookAt(self.data.player.midpoint)
 
         # loads the sounds needed
         self.sounds = {
@@ -70,6 +83,9 @@ class GamePlay(GameState):
             "applause": self.data.audio_system.create_sound("./data/audio/Emotions_Group_Applause.ogg", mode=MODE.LOOP_OFF)
         }
 
+        # spawn the ships and point the camera at the player
+        self.reset()
+
     def init_debug_text(self):
         """Initialises the debug text on the screen"""
         self.debug_player_pos = pyasge.Text(self.data.fonts["debug"])
@@ -94,9 +110,15 @@ class GamePlay(GameState):
         self.debug_player_rotation.string = \
             f'(' + f'{abs(float(self.data.player.rotation * 180 / math.pi)):04f}' + f')'
 
+        self.debug_render_queue = pyasge.Text(self.data.fonts["debug"])
+        self.debug_render_queue.x = 25
+        self.debug_render_queue.y = self.debug_player_rotation.y + 20
+        self.debug_render_queue.scale = 1.0
+        self.debug_render_queue.string = ""
+
     def init_ui(self):
         """Initialises the UI elements"""
-        self.ui_enemy_icon = self.data.renderer.loadTexture("./data/sprites/ships/ship (4).png")
+        self.ui_enemy_icon = self.data.assets.texture(UI_ENEMY_ICON)
         self.ui_enemy_icon.setMagFilter(pyasge.MagFilter.LINEAR)
         self.ui_score = pyasge.Text(self.data.fonts["score"], str(000000))
         self.ui_score.x = 25
@@ -104,13 +126,30 @@ class GamePlay(GameState):
         self.ui_score.colour = pyasge.COLOURS.BLACK
         self.ui_score.scale = 1
 
+    def reset(self) -> None:
+        """ Puts the game world back to a clean start, reusing the state's resources """
+        self.data.renderer.setClearColour((201 / 255, 236 / 255, 251 / 255))
+        self.paths.cancel_all()
+        self.player_route = None
+        self.simulation.clear()
+        self.reset_player()
+        self.spawn_enemies()
+
+        # the player goes first, so it's the ship the enemies chase
+        self.ships = [self.data.player] + self.enemies
+        for ship in self.ships:
+            self.simulation.add_ship(ship.state)
+        self.camera.lookAt(self.data.player.midpoint)
+
     def click_handler(self, event: pyasge.ClickEvent) -> None:
         if event.button is pyasge.MOUSE.MOUSE_BTN2 and \
                 event.action is pyasge.MOUSE.BUTTON_PRESSED:
 
-            # launch a cannonball from the ship's origin to click position
-            cannonball = Cannonball(self.data.player.midpoint, self.to_world(pyasge.Point2D(event.x, event.y)))
-            self.cannonballs.append(cannonball)
+            # launch a cannonball from the ship's origin to click position, if there's one free
+            origin = self.data.player.midpoint
+            target = self.to_world(pyasge.Point2D(event.x, event.y))
+            if not self.simulation.fire(self.ships.index(self.data.player), origin.x, origin.y, target.x, target.y):
+                return
 
             # play audio to signal a cannonball has been launched
             channel = self.data.audio_system.play_sound(self.sounds["fire"])
@@ -118,8 +157,10 @@ class GamePlay(GameState):
         if event.button is pyasge.MOUSE.MOUSE_BTN1 and \
                 event.action is pyasge.MOUSE.BUTTON_PRESSED:
 
-            # updates the player's route
-            self.data.player.set_sail((resolve(self.to_world(pyasge.Point2D(event.x, event.y)), self.data)))
+            # updates the player's route once the scheduler has found it
+            if self.player_route is not None:
+                self.player_route.cancel()
+            self.player_route = request_route(self.to_world(pyasge.Point2D(event.x, event.y)), self.data, self.paths)
 
     def move_handler(self, event: pyasge.MoveEvent) -> None:
         """ Listens for mouse movement events from the game engine """
@@ -133,25 +174,33 @@ class GamePlay(GameState):
             return
 
     def spawn_enemies(self) -> None:
-        """ Loads the map and spawns enemies"""
-        rands = random.sample(self.data.game_map.spawns, 5)
+        """ Spawns the enemies at random spawn points, reusing any made before """
+        rands = self.simulation.random.sample(self.data.game_map.spawns, 5)
         while len(self.enemies) != 5:
-            self.enemies.append(Enemy())
+            self.enemies.append(Enemy(self.data.assets))
+
+        for enemy in self.enemies:
             x, y = rands.pop()
-            self.enemies[-1].x = x
-            self.enemies[-1].y = y
+            enemy.x = x
+            enemy.y = y
+            enemy.reset()
 
     def reset_player(self) -> None:
-        """ Loads the player and sets its initial position"""
+        """ Repairs the player and sets its initial position"""
+        self.data.player.reset()
         self.data.player.position = pyasge.Point2D(5407, 775)
         self.data.player.destination = [self.data.player.position]
 
     def fixed_update(self, game_time: pyasge.GameTime) -> None:
         """ Simulates deterministic time steps for the game objects"""
-        for cannonball in self.cannonballs:
-            cannonball.fixed_update(game_time)
-        self.resolveCannonballs()
-        self.data.player.fixed_update(game_time)
+        profiler = self.data.profiler
+        with profiler.section("PathScheduler.update"):
+            self.paths.update()
+        with profiler.section("Simulation.step"):
+            self.simulation.step(game_time.fixed_timestep)
+        with profiler.section("resolveCannonballs"):
+            self.resolveCannonballs()
+        self.data.game_map.prefetch(self.data.player.midpoint, self.data.player.direction)
 
     def update(self, game_time: pyasge.GameTime) -> GameStateID:
         """ Updates the game world
@@ -171,10 +220,6 @@ class GamePlay(GameState):
         # follow the player and clamp the camera
         self.update_camera()
 
-        # updates the cannonballs
-        for cannonball in self.cannonballs:
-            cannonball.update(game_time)
-
         # updates the enemy ships
         for enemy in self.enemies:
             enemy.update(game_time)
@@ -207,57 +252,44 @@ class GamePlay(GameState):
     def render(self, game_time: pyasge.GameTime) -> None:
         """ Renders the game world and the UI """
         self.data.renderer.setProjectionMatrix(self.camera.view)
-        self.data.game_map.render(self.data.renderer, game_time)
-        self.data.player.render(self.data.renderer, game_time)
+        with self.data.profiler.section("GameMap.render"):
+            self.data.game_map.render(self.data.renderer, game_time, self.camera.view)
+        # ships only move their active frame to match their state once they're drawn
+        self.data.player.sync()
+        self.render_queue.submit(self.data.player.active_frame, self.data.player.texture)
 
         for enemy in self.enemies:
-            enemy.render(self.data.renderer, game_time)
+            enemy.sync()
+            self.render_queue.submit(enemy.active_frame, enemy.texture)
+
+        for cannonball in self.cannonballs.visible(self.camera.view):
+            self.render_queue.submit(cannonball.sprite, cannonball.texture)
 
-        for cannonball in self.cannonballs:
-            cannonball.render(self.data.renderer, game_time)
+        with self.data.profiler.section("RenderQueue.flush"):
+            self.render_queue.flush(self.data.renderer, self.camera.view)
 
         self.render_ui()
 
     def resolveCannonballs(self) -> None:
         """
-        Updates the active cannonballs in the world
+        Plays out what the cannonballs did in the last simulated step
 
-        Checks to see if the cannonballs have reached their target
-        or collided with a ship. If they hit a ship the ship's hp
-        will drop by 1. This of course can be changed or tweaked.
-        At present if the ship's hp is below 0, the console will
-        print the "dead" message
+        The simulation has already checked to see if the cannonballs
+        reached their target or collided with a ship, and a ship that
+        was hit has lost 1 hp. Here the sounds are played, and hitting
+        an enemy scores the player 100 points. This of course can be
+        changed or tweaked.
         """
-        # check to see if canonballs are finished
-        for cannonball in self.cannonballs:
-
-            # check for collisions
-            for enemy in self.enemies:
-                if enemy.hp == 0:
-                    continue
-
-                b2 = cannonball.world_bounds
-                b1 = enemy.world_bounds
-
-                if (b1.v1.x < b2.v2.x and
-                        b1.v2.x > b2.v1.x and
-                        b1.v1.y < b2.v4.y and
-                        b1.v4.y > b2.v1.y):
+        for event, index in self.simulation.events:
+            if event == HIT:
+                if self.ships[index] is not self.data.player:
                     self.data.player.score_add += 100
-                    self.cannonballs.remove(cannonball)
-                    enemy.hp -= 1
-                    channel = self.data.audio_system.play_sound(self.sounds["hit"])
-                    channel.volume = 0.35
-
-                if enemy.hp == 0:
-                    self.data.audio_system.play_sound(self.sounds["sunk"])
-
-            if cannonball.position == cannonball.destination:
-                tile_xy = self.data.game_map.tile(cannonball.position)
-                tile = (self.data.game_map.map[2][1])[tile_xy[1]][tile_xy[0]]
-                if not tile:
-                    self.data.audio_system.play_sound(self.sounds["miss"])
-                self.cannonballs.remove(cannonball)
+                channel = self.data.audio_system.play_sound(self.sounds["hit"])
+                channel.volume = 0.35
+            elif event == SUNK:
+                self.data.audio_system.play_sound(self.sounds["sunk"])
+            elif event == MISS:
+                self.data.audio_system.play_sound(self.sounds["miss"])
 
     def render_ui(self) -> None:
         """ Render the UI elements and map to the whole window """
@@ -291,6 +323,29 @@ class GamePlay(GameState):
             f'(' + f'{abs(float(self.data.player.rotation * 180 / math.pi)):04f}' + f')'
         self.data.renderer.render(self.debug_player_rotation)
 
+        stats = self.render_queue.stats
+        self.debug_render_queue.string = \
+            f'sprites {stats["drawn"]}/{stats["submitted"]} culled {stats["culled"]} batches {stats["batches"]} ' \
+            f'cannonballs {len(self.cannonballs)}/{self.cannonballs.capacity} peak {self.cannonballs.peak}'
+        self.data.renderer.render(self.debug_render_queue)
+
+        if self.data.profiler.enabled:
+            self.render_profile()
+
+    def render_profile(self) -> None:
+        """ Renders the min, average and 99th percentile time of each profiled section """
+        y = self.debug_render_queue.y + 20
+        for index, (name, (low, mean, p99)) in enumerate(self.data.profiler.summary().items()):
+            if index == len(self.debug_profile):
+                text = pyasge.Text(self.data.fonts["debug"])
+                text.x = 25
+                text.y = y + 20 * index
+                text.scale = 1.0
+                self.debug_profile.append(text)
+
+            self.debug_profile[index].string = f'{name:<22} {low:6.2f} {mean:6.2f} {p99:6.2f} ms'
+            self.data.renderer.render(self.debug_profile[index])
+
     def to_world(self, pos: pyasge.Point2D) -> pyasge.Point2D:
         """
         Converts from screen position to world position
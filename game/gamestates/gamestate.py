@@ -33,6 +33,15 @@ class GameState(ABC):
         self.id = GameStateID.UNKNOWN
         self.data = data
 
+    def reset(self) -> None:
+        """ Called when a cached state is entered again
+
+        States are kept alive between transitions so their resources
+        don't have to be rebuilt. Override this to put the state's
+        gameplay values back to how they were when it was created.
+        """
+        pass
+
     @abstractmethod
     def click_handler(self, event: pyasge.ClickEvent) -> None:
         pass
@@ -0,0 +1,158 @@
+"""
+A* search over the flat cost grid.
+
+The search works purely on integer cell indices, using a binary heap
+for the open list and a set for the closed list. Heuristics are plain
+functions of the absolute tile delta so they can be swapped to match
+the connectivity being searched.
+"""
+
+import heapq
+from typing import Callable, Optional, Tuple
+
+from game.pathfinding.grid import CostGrid, IMPASSABLE, SQRT2
+
+Heuristic = Callable[[int, int], float]
+
+
+def manhattan(dx: int, dy: int) -> float:
+    """Admissible for 4-way movement"""
+    return dx + dy
+
+
+def octile(dx: int, dy: int) -> float:
+    """Admissible for 8-way movement where diagonals cost sqrt(2)"""
+    if dx > dy:
+        return dx + (SQRT2 - 1) * dy
+    return dy + (SQRT2 - 1) * dx
+
+
+class Search:
+    """
+    A single A* query
+
+    The search can be advanced a few expansions at a time by calling
+    `step` with a budget, or run to completion in one go. Once `done`
+    is set, `path` holds the tile locations from start to goal, or
+    None if the goal could not be reached.
+    """
+
+    def __init__(self, grid: CostGrid, start: int, goal: int, heuristic: Heuristic, diagonal: bool) -> None:
+        self.grid = grid
+        self.start = start
+        self.goal = goal
+        self.heuristic = heuristic
+        self.neighbours = grid.neighbours(diagonal)
+
+        self.open = [(0.0, 0.0, start)]
+        self.g = {start: 0.0}
+        self.parent = {start: start}
+        self.closed = set()
+        self.expanded = 0
+
+        self.done = False
+        self.path = None
+        if grid.cells[goal] >= IMPASSABLE:
+            self.open.clear()
+            self.done = True
+
+    def step(self, budget: int = -1) -> bool:
+        """
+        Expands up to `budget` cells, or all of them when negative
+
+        Returns:
+            bool: True once the search has finished
+        """
+        if self.done:
+            return True
+
+        cells = self.grid.cells
+        stride = self.grid.stride
+        heuristic = self.heuristic
+        neighbours = self.neighbours
+        open_list = self.open
+        closed = self.closed
+        g = self.g
+        parent = self.parent
+        goal = self.goal
+        gy, gx = divmod(goal, stride)
+        expanded = 0
+
+        while open_list and budget != 0:
+            current = heapq.heappop(open_list)[2]
+            if current in closed:
+                continue
+
+            if current == goal:
+                self.path = self._backtrack()
+                break
+
+            closed.add(current)
+            expanded += 1
+            budget -= 1
+            base = g[current]
+
+            for offset, step, side_a, side_b in neighbours:
+                cell = current + offset
+                cost = cells[cell]
+                if cost >= IMPASSABLE or cell in closed:
+                    continue
+
+                # diagonal moves must not squeeze between two blocked tiles
+                if side_a and (cells[current + side_a] >= IMPASSABLE or cells[current + side_b] >= IMPASSABLE):
+                    continue
+
+                new_g = base + cost * step
+                if new_g < g.get(cell, new_g + 1):
+                    g[cell] = new_g
+                    parent[cell] = current
+                    y, x = divmod(cell, stride)
+                    h = heuristic(abs(x - gx), abs(y - gy))
+                    heapq.heappush(open_list, (new_g + h, h, cell))
+
+        self.expanded += expanded
+        self.done = self.path is not None or not open_list
+        return self.done
+
+    def _backtrack(self) -> list[Tuple[int, int]]:
+        """Follows the parent links from the goal back to the start"""
+        cell = self.goal
+        path = [self.grid.xy(cell)]
+        while cell != self.start:
+            cell = self.parent[cell]
+            path.append(self.grid.xy(cell))
+        path.reverse()
+        return path
+
+
+class AStar:
+    """
+    A* pathfinder for a cost grid
+
+    Args:
+        grid (CostGrid): The grid to search
+        heuristic (Heuristic): Estimate of the remaining cost, see `manhattan` and `octile`
+        diagonal (bool): Allow 8-way movement instead of 4-way
+    """
+
+    def __init__(self, grid: CostGrid, heuristic: Heuristic = manhattan, diagonal: bool = False) -> None:
+        self.grid = grid
+        self.heuristic = heuristic
+        self.diagonal = diagonal
+        self.expanded = 0
+
+    def query(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Search:
+        """Creates a search that can be stepped by the caller"""
+        return Search(self.grid, self.grid.index(*start), self.grid.index(*goal), self.heuristic, self.diagonal)
+
+    def find(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[list[Tuple[int, int]]]:
+        """
+        Finds the cheapest route between two tiles
+
+        Returns:
+            list[Tuple[int, int]]: The tiles to visit, including start and goal, or None
+        """
+        search = self.query(start, goal)
+        search.step()
+        self.expanded = search.expanded
+        return search.path
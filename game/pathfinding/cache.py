@@ -0,0 +1,68 @@
+"""
+A bounded cache of resolved paths.
+
+Players tend to click the same destinations over and over, so there's
+no need to search for a route that was found moments ago. The cache is
+tied to the version of a cost grid and is emptied as soon as any cost
+changes, which means a cached path is never one that is now blocked.
+"""
+
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from game.pathfinding.grid import CostGrid
+
+CACHE_CAPACITY = 256
+MISSING = object()
+
+
+class PathCache:
+    """
+    Least recently used cache of tile paths
+
+    Unreachable destinations are cached as None so repeated clicks on
+    an island are also free. Paths are stored as tuples and handed out
+    as new lists, so callers can consume them however they like.
+
+    Args:
+        grid (CostGrid): The grid the cached paths were found on
+        capacity (int): The maximum number of paths to keep
+    """
+
+    def __init__(self, grid: CostGrid, capacity: int = CACHE_CAPACITY) -> None:
+        self.grid = grid
+        self.capacity = capacity
+        self.version = grid.version
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        """Returns a copy of the cached path, None for unreachable or MISSING if unknown"""
+        if self.version != self.grid.version:
+            self.clear()
+
+        path = self.entries.get(key, MISSING)
+        if path is MISSING:
+            self.misses += 1
+            return MISSING
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return None if path is None else list(path)
+
+    def put(self, key: Hashable, path: Optional[list[Tuple[int, int]]]) -> None:
+        """Stores a path, evicting the least recently used one if full"""
+        if self.version != self.grid.version:
+            self.clear()
+
+        self.entries[key] = None if path is None else tuple(path)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.version = self.grid.version
@@ -0,0 +1,186 @@
+"""
+Connected regions of navigable water.
+
+Every walkable tile is labelled with the region of water it belongs
+to. Two tiles can only be connected by a route if they share a label,
+so a click on a landlocked lagoon can be rejected without searching
+the whole map first.
+"""
+
+from collections import deque
+from typing import Optional, Tuple
+
+from game.pathfinding.grid import CostGrid, IMPASSABLE
+
+BLOCKED = -1
+OUTSIDE = -2
+
+# how many tiles to search around a blocked tile for a way between its neighbours
+LOCAL_SEARCH = 256
+
+
+class ComponentIndex:
+    """
+    A connected-component labelling of the walkable tiles
+
+    Labels are kept up to date as costs change. Opening a tile merges
+    the regions around it with a union-find. Blocking one first looks
+    for a short way around it between its open neighbours, and only
+    re-floods the region it belonged to if there isn't one, as that's
+    when the region may have split.
+
+    Diagonal moves can't cut corners, so any diagonal step can also be
+    made as two straight ones and 4-way regions hold for both modes.
+
+    Args:
+        grid (CostGrid): The grid to label
+    """
+
+    def __init__(self, grid: CostGrid) -> None:
+        self.grid = grid
+        self.labels = [OUTSIDE] * len(grid.cells)
+        self.parent = []
+        self.offsets = tuple(move[0] for move in grid.neighbours(False))
+
+        for y in range(grid.height):
+            for x in range(grid.width):
+                self.labels[grid.index(x, y)] = BLOCKED
+
+        for y in range(grid.height):
+            for x in range(grid.width):
+                cell = grid.index(x, y)
+                if self.labels[cell] == BLOCKED and grid.cells[cell] < IMPASSABLE:
+                    self._flood(cell, self._new_label(), None)
+
+        grid.listeners.append(self._cost_changed)
+
+    def label(self, x: int, y: int) -> int:
+        """The region a tile belongs to, or BLOCKED"""
+        if not self.grid.in_bounds(x, y):
+            return BLOCKED
+
+        label = self.labels[self.grid.index(x, y)]
+        return BLOCKED if label < 0 else self._find(label)
+
+    def connected(self, a: Tuple[int, int], b: Tuple[int, int]) -> bool:
+        """True if a route could exist between two tiles"""
+        label = self.label(*a)
+        return label != BLOCKED and label == self.label(*b)
+
+    def nearest(self, goal: Tuple[int, int], start: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """
+        Finds the tile closest to a goal that can be reached from start
+
+        Returns:
+            Tuple[int, int]: The tile to head for instead, or None if start is blocked
+        """
+        target = self.label(*start)
+        if target == BLOCKED or not self.grid.in_bounds(*goal):
+            return None
+
+        labels = self.labels
+        origin = self.grid.index(*goal)
+        visited = {origin}
+        frontier = deque([origin])
+        while frontier:
+            cell = frontier.popleft()
+            if labels[cell] >= 0 and self._find(labels[cell]) == target:
+                return self.grid.xy(cell)
+
+            for offset in self.offsets:
+                other = cell + offset
+                if other not in visited and labels[other] != OUTSIDE:
+                    visited.add(other)
+                    frontier.append(other)
+
+        return None
+
+    def _new_label(self) -> int:
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def _find(self, label: int) -> int:
+        parent = self.parent
+        root = label
+        while parent[root] != root:
+            root = parent[root]
+        while parent[label] != root:
+            parent[label], label = root, parent[label]
+        return root
+
+    def _flood(self, origin: int, label: int, region: Optional[int]) -> None:
+        """
+        Gives a label to every walkable tile connected to origin
+
+        When region is None only unlabelled tiles are flooded, otherwise
+        the flood is limited to tiles that belonged to that region.
+        """
+        cells = self.grid.cells
+        labels = self.labels
+        labels[origin] = label
+        frontier = [origin]
+        while frontier:
+            cell = frontier.pop()
+            for offset in self.offsets:
+                other = cell + offset
+                current = labels[other]
+                if current == label or cells[other] >= IMPASSABLE:
+                    continue
+                if (region is None and current == BLOCKED) or \
+                        (region is not None and current >= 0 and self._find(current) == region):
+                    labels[other] = label
+                    frontier.append(other)
+
+    def _cost_changed(self, x: int, y: int) -> None:
+        cell = self.grid.index(x, y)
+        was_open = self.labels[cell] >= 0
+        is_open = self.grid.cells[cell] < IMPASSABLE
+        if was_open == is_open:
+            return
+
+        if is_open:
+            # an opened tile joins together every region around it
+            roots = {self._find(self.labels[cell + offset]) for offset in self.offsets
+                     if self.labels[cell + offset] >= 0}
+            if not roots:
+                self.labels[cell] = self._new_label()
+                return
+
+            root = roots.pop()
+            for other in roots:
+                self.parent[other] = root
+            self.labels[cell] = root
+            return
+
+        # a blocked tile may split its region, so re-flood what's left of it
+        region = self._find(self.labels[cell])
+        self.labels[cell] = BLOCKED
+        neighbours = [cell + offset for offset in self.offsets if self.labels[cell + offset] >= 0]
+        if self._joined(neighbours):
+            return
+
+        for other in neighbours:
+            if self.labels[other] >= 0 and self._find(self.labels[other]) == region:
+                self._flood(other, self._new_label(), region)
+
+    def _joined(self, cells: list) -> bool:
+        """True if a short search from the first cell finds all the others"""
+        if len(cells) < 2:
+            return True
+
+        labels = self.labels
+        remaining = set(cells[1:])
+        visited = {cells[0]}
+        frontier = deque([cells[0]])
+        while frontier and len(visited) < LOCAL_SEARCH:
+            cell = frontier.popleft()
+            for offset in self.offsets:
+                other = cell + offset
+                if other in visited or labels[other] < 0:
+                    continue
+                remaining.discard(other)
+                if not remaining:
+                    return True
+                visited.add(other)
+                frontier.append(other)
+        return False
@@ -0,0 +1,57 @@
+"""
+Whole-grid operations on NumPy arrays.
+
+These work on the map's cost and layer arrays in bulk, for code that
+wants an answer for every tile (or a block of tiles) at once rather
+than looping over them one at a time in Python.
+"""
+
+import numpy as np
+
+
+def distance_transform(mask: np.ndarray, diagonal: bool = True) -> np.ndarray:
+    """
+    The distance in tiles from every tile to the nearest False tile
+
+    Args:
+        mask (np.ndarray): Tiles to measure from are True, e.g. the walkable mask
+        diagonal (bool): Count diagonal steps as one tile (chessboard) instead of two (city block)
+
+    Returns:
+        np.ndarray: Distances, 0 on False tiles
+    """
+    height, width = mask.shape
+    limit = height + width
+    distances = np.where(mask, limit, 0).astype(np.int32)
+
+    # relax the distances one tile further out each pass until they settle
+    while True:
+        padded = np.pad(distances, 1, constant_values=limit)
+        nearest = np.minimum.reduce([
+            padded[:-2, 1:-1], padded[2:, 1:-1], padded[1:-1, :-2], padded[1:-1, 2:]])
+        if diagonal:
+            nearest = np.minimum.reduce([
+                nearest, padded[:-2, :-2], padded[:-2, 2:], padded[2:, :-2], padded[2:, 2:]])
+
+        relaxed = np.minimum(distances, nearest + 1)
+        if np.array_equal(relaxed, distances):
+            return distances
+        distances = relaxed
+
+
+def summed_area(values: np.ndarray) -> np.ndarray:
+    """A summed-area table with a leading row and column of zeros"""
+    table = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.int64)
+    table[1:, 1:] = values.cumsum(axis=0).cumsum(axis=1)
+    return table
+
+
+def region_sum(table: np.ndarray, x: int, y: int, width: int, height: int) -> int:
+    """Sums a rectangle of tiles in constant time using a summed-area table"""
+    x0 = max(x, 0)
+    y0 = max(y, 0)
+    x1 = min(x + width, table.shape[1] - 1)
+    y1 = min(y + height, table.shape[0] - 1)
+    if x1 <= x0 or y1 <= y0:
+        return 0
+    return int(table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0])
@@ -0,0 +1,183 @@
+"""
+A flow field that leads every tile towards a shared target.
+
+Rather than each enemy searching for its own route to the player, a
+single Dijkstra search is run outwards from the player's tile. Every
+tile then knows which neighbour is one step closer, so any number of
+ships can steer with a single lookup each.
+"""
+
+import heapq
+import math
+from collections import OrderedDict
+from typing import Iterable, Tuple
+
+from game.pathfinding.grid import CostGrid, IMPASSABLE
+
+# how many tiles the cached fields may hold between them, for targets that come back
+FIELD_CACHE = 1 << 20
+
+
+class FlowField:
+    """
+    Per-tile directions and distances towards one or more targets
+
+    The field is only recomputed when the targets move to a different
+    tile or the grid's costs change. Recently computed fields are cached
+    by their targets, so a target moving back and forth between tiles
+    doesn't search again. The cache is emptied when the costs change.
+
+    The search is lazy. It only runs as far out as the tiles that have
+    been asked about, and picks up where it left off when a tile further
+    away is asked about, so ships close to their target only pay for
+    the tiles around it. Each field only stores the tiles its search
+    has reached, and the cache is bounded by how many that adds up to.
+
+    Args:
+        grid (CostGrid): The grid to flow over
+        diagonal (bool): Allow 8-way movement, which gives smoother steering
+        capacity (int): How many tiles the cached fields may hold
+    """
+
+    def __init__(self, grid: CostGrid, diagonal: bool = True, capacity: int = FIELD_CACHE) -> None:
+        self.grid = grid
+        self.neighbours = grid.neighbours(diagonal)
+        self.targets = None
+        self.version = -1
+        self.distances = {}
+        self.next = {}
+        self.open_list = []
+        self.settled = set()
+        self.capacity = capacity
+        self.fields = OrderedDict()
+
+        # the moves out of each cell as a bit mask, and the (offset, step) pairs of every mask
+        self.moves = [tuple((offset, step) for bit, (offset, step, _, _) in enumerate(self.neighbours)
+                            if mask >> bit & 1) for mask in range(1 << len(self.neighbours))]
+        self.links = bytearray(len(grid.cells))
+        for cell in range(len(grid.cells)):
+            self._link(cell)
+        grid.listeners.append(self._cost_changed)
+
+    def update(self, targets: Iterable[Tuple[int, int]]) -> bool:
+        """
+        Points the field at new targets
+
+        Returns:
+            bool: True if the field had to be recomputed
+        """
+        targets = tuple(targets)
+        if targets == self.targets and self.version == self.grid.version:
+            return False
+
+        if self.version != self.grid.version:
+            self.version = self.grid.version
+            self.fields.clear()
+
+        self.targets = targets
+        field = self.fields.get(targets)
+        if field is None:
+            self._start()
+            self.fields[targets] = self.distances, self.next, self.open_list, self.settled
+        else:
+            self.fields.move_to_end(targets)
+            self.distances, self.next, self.open_list, self.settled = field
+
+        # fields grow as they're searched, so the oldest are dropped once they hold too many tiles
+        while len(self.fields) > 1 and sum(len(field[0]) for field in self.fields.values()) > self.capacity:
+            self.fields.popitem(last=False)
+        return True
+
+    def direction(self, x: int, y: int) -> Tuple[int, int]:
+        """The tile step to take from a tile, (0, 0) at a target or when it can't be reached"""
+        if not self.grid.in_bounds(x, y):
+            return 0, 0
+
+        index = self.grid.index(x, y)
+        if index not in self.settled:
+            self._settle(index)
+
+        step = self.next.get(index, -1)
+        if step < 0:
+            return 0, 0
+
+        nx, ny = self.grid.xy(step)
+        return nx - x, ny - y
+
+    def distance(self, x: int, y: int) -> float:
+        """The cost of travelling from a tile to the nearest target"""
+        if not self.grid.in_bounds(x, y):
+            return math.inf
+
+        index = self.grid.index(x, y)
+        if index not in self.settled:
+            self._settle(index)
+        return self.distances.get(index, math.inf)
+
+    def _link(self, cell: int) -> None:
+        """Works out which neighbours a cell's neighbours can reach it from"""
+        cells = self.grid.cells
+        mask = 0
+        if cells[cell] < IMPASSABLE:
+            for bit, (offset, step, side_a, side_b) in enumerate(self.neighbours):
+                if cells[cell + offset] >= IMPASSABLE:
+                    continue
+                if side_a and (cells[cell + side_a] >= IMPASSABLE or cells[cell + side_b] >= IMPASSABLE):
+                    continue
+                mask |= 1 << bit
+        self.links[cell] = mask
+
+    def _cost_changed(self, x: int, y: int) -> None:
+        # a tile only affects its own moves and those of the neighbours that pass by it
+        stride = self.grid.stride
+        index = self.grid.index(x, y)
+        for row in (index - stride, index, index + stride):
+            for cell in (row - 1, row, row + 1):
+                self._link(cell)
+
+    def _start(self) -> None:
+        """Begins a multi-source Dijkstra outwards from the targets"""
+        self.distances = {}
+        self.next = {}
+        self.settled = set()
+        self.open_list = []
+
+        for x, y in self.targets:
+            if self.grid.walkable(x, y):
+                index = self.grid.index(x, y)
+                self.distances[index] = 0.0
+                self.open_list.append((0.0, index))
+        heapq.heapify(self.open_list)
+
+    def _settle(self, index: int) -> None:
+        """Carries on the search until a cell's distance is final, or everything reachable is"""
+        cells = self.grid.cells
+        links = self.links
+        moves = self.moves
+        distances = self.distances
+        next_cell = self.next
+        open_list = self.open_list
+        settled = self.settled
+
+        # neighbours reach a cell by moving in to it, so they pay its cost
+        heappop = heapq.heappop
+        heappush = heapq.heappush
+        inf = math.inf
+        while open_list and index not in settled:
+            d, cell = heappop(open_list)
+            if cell in settled:
+                continue
+            settled.add(cell)
+
+            cost = cells[cell]
+            for offset, step in moves[links[cell]]:
+                other = cell + offset
+                new_d = d + cost * step
+                if new_d < distances.get(other, inf):
+                    distances[other] = new_d
+                    next_cell[other] = cell
+                    heappush(open_list, (new_d, other))
+
+        # nothing left to search, so whatever wasn't reached never will be
+        if not open_list:
+            settled.add(index)
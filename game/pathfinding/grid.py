@@ -0,0 +1,87 @@
+"""
+The cost grid used by the pathfinders.
+
+The game map stores its costs as rows of tiles, which is convenient
+for humans but slow to search. The CostGrid flattens those rows in to
+a single list and surrounds them with a border of impassable cells, so
+a neighbour is always just an offset away and no bounds checks are
+needed inside a search loop.
+"""
+
+import math
+from typing import Iterable, Tuple
+
+IMPASSABLE = 100
+SQRT2 = math.sqrt(2)
+
+
+class CostGrid:
+    """
+    A flat, padded, row-major copy of the map's pathfinding costs
+
+    Tiles are addressed by their cell index, which can be converted to
+    and from tile co-ordinates with `index` and `xy`. Any cell with a
+    cost of IMPASSABLE or more (including the padding) is treated as a
+    wall.
+    """
+
+    def __init__(self, costs: Iterable[Iterable[int]]) -> None:
+        rows = [list(row) for row in costs]
+        self.height = len(rows)
+        self.width = len(rows[0]) if rows else 0
+        self.stride = self.width + 2
+
+        # the padded border means every real cell has eight neighbours
+        self.cells = [IMPASSABLE] * (self.stride * (self.height + 2))
+        for y, row in enumerate(rows):
+            start = self.index(0, y)
+            self.cells[start:start + self.width] = row
+
+        # bumped whenever a cost changes so anything derived from the grid knows it's stale
+        self.version = 0
+        self.listeners = []
+
+        s = self.stride
+        self.orthogonal_moves = ((-s, 1.0, 0, 0), (1, 1.0, 0, 0), (s, 1.0, 0, 0), (-1, 1.0, 0, 0))
+        self.diagonal_moves = self.orthogonal_moves + (
+            (-s + 1, SQRT2, -s, 1), (s + 1, SQRT2, s, 1),
+            (s - 1, SQRT2, s, -1), (-s - 1, SQRT2, -s, -1))
+
+    def index(self, x: int, y: int) -> int:
+        """Converts a tile location to its cell index"""
+        return (y + 1) * self.stride + x + 1
+
+    def xy(self, index: int) -> Tuple[int, int]:
+        """Converts a cell index back in to a tile location"""
+        y, x = divmod(index, self.stride)
+        return x - 1, y - 1
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def cost(self, x: int, y: int) -> int:
+        return self.cells[self.index(x, y)]
+
+    def walkable(self, x: int, y: int) -> bool:
+        return self.in_bounds(x, y) and self.cells[self.index(x, y)] < IMPASSABLE
+
+    def set_cost(self, x: int, y: int, cost: int) -> None:
+        """Changes a tile's cost and lets any listeners know which tile changed"""
+        index = self.index(x, y)
+        if self.cells[index] == cost:
+            return
+
+        self.cells[index] = cost
+        self.version += 1
+        for listener in self.listeners:
+            listener(x, y)
+
+    def neighbours(self, diagonal: bool) -> tuple:
+        """
+        The neighbour offsets used when expanding a cell
+
+        Each entry is (offset, step multiplier, side a, side b). Diagonal
+        moves list the two orthogonal cells they pass between, which must
+        both be walkable to stop ships from cutting across corners.
+        """
+        return self.diagonal_moves if diagonal else self.orthogonal_moves
@@ -0,0 +1,325 @@
+"""
+Hierarchical pathfinding (HPA*).
+
+The map is divided in to fixed size clusters. Wherever two clusters
+share an open border an entrance is placed, and the cost of travelling
+between the entrances inside each cluster is cached. Queries search
+this much smaller abstract graph and then only refine the steps of the
+route that are actually used back in to tiles.
+"""
+
+import heapq
+from itertools import chain
+from typing import Optional, Tuple
+
+from game.pathfinding.astar import AStar, Search, manhattan, octile
+from game.pathfinding.grid import CostGrid, IMPASSABLE
+
+CLUSTER_SIZE = 10
+MAX_ENTRANCE_WIDTH = 6
+
+
+class ClusterGraph:
+    """
+    An abstract graph of cluster entrances built over a cost grid
+
+    The graph listens for cost changes on the grid and only rebuilds
+    the clusters that were touched, the next time it is queried.
+
+    Args:
+        grid (CostGrid): The grid to abstract
+        cluster_size (int): The width and height of each cluster in tiles
+        diagonal (bool): Allow 8-way movement inside the clusters
+    """
+
+    def __init__(self, grid: CostGrid, cluster_size: int = CLUSTER_SIZE, diagonal: bool = False) -> None:
+        self.grid = grid
+        self.size = cluster_size
+        self.heuristic = octile if diagonal else manhattan
+        self.neighbours = grid.neighbours(diagonal)
+        self.local = AStar(grid, self.heuristic, diagonal)
+        self.columns = -(-grid.width // cluster_size)
+        self.rows = -(-grid.height // cluster_size)
+        self.expanded = 0
+
+        # which cluster each cell belongs to, -1 for the padding
+        self.cluster_of = [-1] * len(grid.cells)
+        for y in range(grid.height):
+            row = (y // cluster_size) * self.columns
+            for x in range(grid.width):
+                self.cluster_of[grid.index(x, y)] = row + x // cluster_size
+
+        self.borders = {}  # (cluster, neighbour) -> [(cell, cell)]
+        self.nodes = [set() for _ in range(self.columns * self.rows)]
+        self.inter = {}  # entrance -> {entrance in the neighbouring cluster: cost}
+        self.intra = {}  # entrance -> {entrance in the same cluster: cost}
+        self.dirty = set()
+
+        for cluster in range(len(self.nodes)):
+            for first, second in self._borders(cluster):
+                if first == cluster:
+                    self._build_border(first, second)
+        for cluster in range(len(self.nodes)):
+            self._build_edges(cluster)
+
+        grid.listeners.append(self._cost_changed)
+
+    def query(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Search:
+        """
+        Creates a search that can be stepped by the caller
+
+        The abstract search can't be paused part way, so this is an A*
+        search over the tiles with the same movement rules, which gives
+        the shortest route rather than a near-shortest one.
+        """
+        return self.local.query(start, goal)
+
+    def find(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[list[Tuple[int, int]]]:
+        """
+        Finds a route between two tiles using the abstract graph
+
+        Returns:
+            list[Tuple[int, int]]: The tiles to visit, including start and goal, or None
+        """
+        self._refresh()
+        grid = self.grid
+        source = grid.index(*start)
+        target = grid.index(*goal)
+        self.expanded = 0
+
+        if grid.cells[target] >= IMPASSABLE:
+            return None
+
+        if source == target:
+            return [start]
+
+        # short trips are cheap to search directly and the abstraction
+        # would only force them through the nearest entrances
+        if abs(start[0] - goal[0]) + abs(start[1] - goal[1]) <= self.size:
+            path = self.local.find(start, goal)
+            self.expanded = self.local.expanded
+            return path
+
+        start_cluster = self.cluster_of[source]
+        goal_cluster = self.cluster_of[target]
+        if start_cluster == goal_cluster:
+            dist, parent = self._dijkstra(source, start_cluster, {target})
+            if target in dist:
+                return [grid.xy(cell) for cell in [source] + self._backtrack(parent, source, target)]
+
+        # temporarily connect the start and goal to their cluster's entrances
+        exit_dist, exit_parent = self._dijkstra(source, start_cluster, self.nodes[start_cluster])
+        entry_dist, entry_parent = self._dijkstra(target, goal_cluster, self.nodes[goal_cluster], reverse=True)
+        exits = {node: cost for node, cost in exit_dist.items() if node in self.nodes[start_cluster]}
+        entries = {node: cost for node, cost in entry_dist.items() if node in self.nodes[goal_cluster]}
+
+        route = self._search(source, target, exits, entries)
+        if route is None:
+            return None
+
+        # refine each abstract step back in to tiles
+        cells = [source]
+        for a, b in zip(route, route[1:]):
+            if self.cluster_of[a] != self.cluster_of[b]:
+                cells.append(b)
+            elif a == source:
+                cells.extend(self._backtrack(exit_parent, source, b))
+            elif b == target:
+                cell = a
+                while cell != target:
+                    cell = entry_parent[cell]
+                    cells.append(cell)
+            else:
+                _, parent = self._dijkstra(a, self.cluster_of[a], {b})
+                cells.extend(self._backtrack(parent, a, b))
+
+        return [grid.xy(cell) for cell in cells]
+
+    def _search(self, source: int, target: int, exits: dict, entries: dict) -> Optional[list[int]]:
+        """A* over the entrance nodes, returns the abstract route"""
+        stride = self.grid.stride
+        heuristic = self.heuristic
+        ty, tx = divmod(target, stride)
+        open_list = [(0.0, source)]
+        g = {source: 0.0}
+        parent = {source: source}
+        closed = set()
+
+        while open_list:
+            node = heapq.heappop(open_list)[1]
+            if node == target:
+                route = [target]
+                while node != source:
+                    node = parent[node]
+                    route.append(node)
+                route.reverse()
+                return route
+
+            if node in closed:
+                continue
+            closed.add(node)
+            self.expanded += 1
+
+            if node == source:
+                edges = chain(exits.items(), self.inter.get(node, {}).items())
+            else:
+                edges = chain(self.inter.get(node, {}).items(), self.intra.get(node, {}).items())
+                if node in entries:
+                    edges = chain(edges, ((target, entries[node]),))
+
+            base = g[node]
+            for other, cost in edges:
+                if other in closed or other == node:
+                    continue
+                new_g = base + cost
+                if new_g < g.get(other, new_g + 1):
+                    g[other] = new_g
+                    parent[other] = node
+                    y, x = divmod(other, stride)
+                    heapq.heappush(open_list, (new_g + heuristic(abs(x - tx), abs(y - ty)), other))
+
+        return None
+
+    def _dijkstra(self, source: int, cluster: int, targets: set, reverse: bool = False) -> Tuple[dict, dict]:
+        """
+        Searches outwards from a cell without leaving its cluster
+
+        Stops once every target has been settled. When reversed the
+        costs are those of travelling towards the source, which is
+        how the goal is connected to its cluster's entrances.
+
+        Returns:
+            Tuple[dict, dict]: The settled distances and the parent links
+        """
+        cells = self.grid.cells
+        cluster_of = self.cluster_of
+        neighbours = self.neighbours
+        dist = {source: 0.0}
+        parent = {source: source}
+        settled = {}
+        remaining = set(targets)
+        remaining.discard(source)
+        open_list = [(0.0, source)]
+
+        while open_list:
+            d, cell = heapq.heappop(open_list)
+            if cell in settled:
+                continue
+            settled[cell] = d
+            remaining.discard(cell)
+            if not remaining:
+                break
+
+            for offset, step, side_a, side_b in neighbours:
+                other = cell + offset
+                if cluster_of[other] != cluster or cells[other] >= IMPASSABLE or other in settled:
+                    continue
+                if side_a and (cells[cell + side_a] >= IMPASSABLE or cells[cell + side_b] >= IMPASSABLE):
+                    continue
+
+                new_d = d + (cells[cell] if reverse else cells[other]) * step
+                if new_d < dist.get(other, new_d + 1):
+                    dist[other] = new_d
+                    parent[other] = cell
+                    heapq.heappush(open_list, (new_d, other))
+
+        return settled, parent
+
+    @staticmethod
+    def _backtrack(parent: dict, source: int, target: int) -> list[int]:
+        """The cells after source up to and including target"""
+        cells = []
+        while target != source:
+            cells.append(target)
+            target = parent[target]
+        cells.reverse()
+        return cells
+
+    def _borders(self, cluster: int) -> list[Tuple[int, int]]:
+        """The (first, second) keys of every border a cluster shares"""
+        cx = cluster % self.columns
+        cy = cluster // self.columns
+        borders = []
+        if cx > 0:
+            borders.append((cluster - 1, cluster))
+        if cy > 0:
+            borders.append((cluster - self.columns, cluster))
+        if cx < self.columns - 1:
+            borders.append((cluster, cluster + 1))
+        if cy < self.rows - 1:
+            borders.append((cluster, cluster + self.columns))
+        return borders
+
+    def _border_cells(self, first: int, second: int) -> list[Tuple[int, int]]:
+        """The pairs of touching cells either side of a border"""
+        index = self.grid.index
+        cx = first % self.columns * self.size
+        cy = first // self.columns * self.size
+        # with a single column, the cluster below is also first + 1
+        if second == first + 1 and first % self.columns != self.columns - 1:
+            x = cx + self.size - 1
+            return [(index(x, y), index(x + 1, y)) for y in range(cy, min(cy + self.size, self.grid.height))]
+
+        y = cy + self.size - 1
+        return [(index(x, y), index(x, y + 1)) for x in range(cx, min(cx + self.size, self.grid.width))]
+
+    def _build_border(self, first: int, second: int) -> None:
+        """Places entrances along the open stretches of a border"""
+        cells = self.grid.cells
+        for a, b in self.borders.pop((first, second), []):
+            self.inter[a].pop(b, None)
+            self.inter[b].pop(a, None)
+
+        # wide openings get an entrance at each end, narrow ones at their cheapest crossing
+        entrances = []
+        run = []
+        for a, b in self._border_cells(first, second) + [(None, None)]:
+            if a is not None and cells[a] < IMPASSABLE and cells[b] < IMPASSABLE:
+                run.append((a, b))
+                continue
+            if len(run) >= MAX_ENTRANCE_WIDTH:
+                entrances += [run[0], run[-1]]
+            elif run:
+                middle = len(run) // 2
+                cheapest = min(range(len(run)), key=lambda i: (cells[run[i][0]] + cells[run[i][1]], abs(i - middle)))
+                entrances.append(run[cheapest])
+            run = []
+
+        self.borders[(first, second)] = entrances
+        for a, b in entrances:
+            self.inter.setdefault(a, {})[b] = cells[b]
+            self.inter.setdefault(b, {})[a] = cells[a]
+
+    def _build_edges(self, cluster: int) -> None:
+        """Caches the cost of travelling between each pair of a cluster's entrances"""
+        for node in self.nodes[cluster]:
+            self.intra.pop(node, None)
+
+        nodes = set()
+        for first, second in self._borders(cluster):
+            side = 0 if first == cluster else 1
+            nodes.update(pair[side] for pair in self.borders.get((first, second), []))
+        self.nodes[cluster] = nodes
+
+        for node in nodes:
+            dist, _ = self._dijkstra(node, cluster, nodes)
+            self.intra[node] = {other: cost for other, cost in dist.items() if other in nodes and other != node}
+
+    def _cost_changed(self, x: int, y: int) -> None:
+        self.dirty.add(self.cluster_of[self.grid.index(x, y)])
+
+    def _refresh(self) -> None:
+        """Rebuilds the borders and edges around any clusters whose costs changed"""
+        if not self.dirty:
+            return
+
+        rebuild = set()
+        for cluster in self.dirty:
+            rebuild.add(cluster)
+            for first, second in self._borders(cluster):
+                self._build_border(first, second)
+                rebuild.update((first, second))
+
+        for cluster in rebuild:
+            self._build_edges(cluster)
+        self.dirty.clear()
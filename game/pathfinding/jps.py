@@ -0,0 +1,283 @@
+"""
+Jump Point Search for grids where every open tile costs the same.
+
+On open water most routes have many equally good symmetric variants,
+and A* wastes its time expanding all of them. JPS instead jumps along
+straight and diagonal lines, only stopping at tiles where an obstacle
+forces a change of direction. Diagonal moves never cut corners, the
+same as the other pathfinders.
+
+JPS+ precomputes the jump distances for every tile and direction so
+that a query only needs table lookups. The tables are built the first
+time they're needed and kept until the grid's costs change.
+"""
+
+import heapq
+from typing import Optional, Tuple
+
+from game.pathfinding.astar import AStar, Search, octile
+from game.pathfinding.grid import CostGrid, IMPASSABLE, SQRT2
+
+# the eight directions as (dx, dy), straight ones first
+DIRECTIONS = ((0, -1), (1, 0), (0, 1), (-1, 0), (1, -1), (1, 1), (-1, 1), (-1, -1))
+
+
+def is_uniform(grid: CostGrid) -> bool:
+    """True when every walkable tile has the same cost"""
+    costs = {cost for cost in grid.cells if cost < IMPASSABLE}
+    return len(costs) <= 1
+
+
+class JumpTables:
+    """
+    The precomputed jump distances used by JPS+
+
+    For every cell and direction the table holds a positive distance to
+    the next jump point, or zero/negative for the number of steps that
+    can be taken before hitting a wall.
+    """
+
+    def __init__(self, grid: CostGrid) -> None:
+        self.version = grid.version
+        self.distances = {}
+
+        # straight directions first, the diagonal tables depend on them
+        for direction in DIRECTIONS:
+            self.distances[direction] = self._build(grid, direction)
+
+    def _build(self, grid: CostGrid, direction: Tuple[int, int]) -> list[int]:
+        cells = grid.cells
+        stride = grid.stride
+        dx, dy = direction
+        offset = dy * stride + dx
+        table = [0] * len(cells)
+
+        # visit cells so that the next cell in the direction is always done first
+        xs = range(grid.width - 1, -1, -1) if dx > 0 else range(grid.width)
+        ys = range(grid.height - 1, -1, -1) if dy > 0 else range(grid.height)
+
+        for y in ys:
+            for x in xs:
+                cell = grid.index(x, y)
+                if cells[cell] >= IMPASSABLE:
+                    continue
+
+                other = cell + offset
+                if cells[other] >= IMPASSABLE:
+                    continue
+                if dx and dy and (cells[cell + dx] >= IMPASSABLE or cells[cell + dy * stride] >= IMPASSABLE):
+                    continue
+
+                if dx and dy:
+                    jump = self.distances[(dx, 0)][other] > 0 or self.distances[(0, dy)][other] > 0
+                else:
+                    jump = _forced(cells, stride, other, dx, dy)
+
+                if jump:
+                    table[cell] = 1
+                elif table[other] > 0:
+                    table[cell] = table[other] + 1
+                else:
+                    table[cell] = table[other] - 1
+
+        return table
+
+
+def _forced(cells: list[int], stride: int, cell: int, dx: int, dy: int) -> bool:
+    """True if a straight move in to a cell uncovers a neighbour that was hidden behind a wall"""
+    if dx:
+        return (cells[cell - stride] < IMPASSABLE <= cells[cell - dx - stride]) or \
+               (cells[cell + stride] < IMPASSABLE <= cells[cell - dx + stride])
+    return (cells[cell - 1] < IMPASSABLE <= cells[cell - 1 - dy * stride]) or \
+           (cells[cell + 1] < IMPASSABLE <= cells[cell + 1 - dy * stride])
+
+
+class JumpPointSearch:
+    """
+    JPS pathfinder with an optional JPS+ mode
+
+    Grids with more than one walkable cost break the symmetry that JPS
+    relies on, so queries on them fall back to weighted A*.
+
+    Args:
+        grid (CostGrid): The grid to search
+        plus (bool): Use the precomputed JPS+ jump tables
+    """
+
+    def __init__(self, grid: CostGrid, plus: bool = False) -> None:
+        self.grid = grid
+        self.plus = plus
+        self.fallback = AStar(grid, octile, diagonal=True)
+        self.expanded = 0
+        self._uniform = None
+        self._tables = None
+
+    @property
+    def uniform(self) -> bool:
+        if self._uniform is None or self._uniform[0] != self.grid.version:
+            self._uniform = (self.grid.version, is_uniform(self.grid))
+        return self._uniform[1]
+
+    @property
+    def tables(self) -> JumpTables:
+        if self._tables is None or self._tables.version != self.grid.version:
+            self._tables = JumpTables(self.grid)
+        return self._tables
+
+    def query(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Search:
+        """
+        Creates a search that can be stepped by the caller
+
+        Jumps can scan a long way in one go, so this steps weighted A*
+        instead, which finds routes just as short and never builds
+        the jump tables.
+        """
+        return self.fallback.query(start, goal)
+
+    def find(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[list[Tuple[int, int]]]:
+        """
+        Finds the shortest route between two tiles
+
+        Returns:
+            list[Tuple[int, int]]: The tiles to visit, including start and goal, or None
+        """
+        if not self.uniform:
+            path = self.fallback.find(start, goal)
+            self.expanded = self.fallback.expanded
+            return path
+
+        grid = self.grid
+        source = grid.index(*start)
+        target = grid.index(*goal)
+        self.expanded = 0
+        if grid.cells[target] >= IMPASSABLE:
+            return None
+
+        successors = self._table_successors if self.plus else self._successors
+        stride = grid.stride
+        ty, tx = divmod(target, stride)
+        open_list = [(0.0, source)]
+        g = {source: 0.0}
+        parent = {source: source}
+        closed = set()
+
+        while open_list:
+            node = heapq.heappop(open_list)[1]
+            if node == target:
+                return self._expand(parent, source, target)
+            if node in closed:
+                continue
+            closed.add(node)
+            self.expanded += 1
+
+            base = g[node]
+            for other, distance in successors(node, parent[node], target):
+                if other in closed:
+                    continue
+                new_g = base + distance
+                if new_g < g.get(other, new_g + 1):
+                    g[other] = new_g
+                    parent[other] = node
+                    y, x = divmod(other, stride)
+                    heapq.heappush(open_list, (new_g + octile(abs(x - tx), abs(y - ty)), other))
+
+        return None
+
+    def _directions(self, node: int, parent: int) -> list[Tuple[int, int]]:
+        """The directions worth exploring from a node given how it was reached"""
+        if node == parent:
+            return list(DIRECTIONS)
+
+        stride = self.grid.stride
+        py, px = divmod(parent, stride)
+        ny, nx = divmod(node, stride)
+        dx = (nx > px) - (nx < px)
+        dy = (ny > py) - (ny < py)
+
+        if dx and dy:
+            return [(dx, 0), (0, dy), (dx, dy)]
+
+        # a straight move may also need to turn around the corner of a wall
+        if dx:
+            return [(dx, 0), (0, -1), (0, 1), (dx, -1), (dx, 1)]
+        return [(0, dy), (-1, 0), (1, 0), (-1, dy), (1, dy)]
+
+    def _successors(self, node: int, parent: int, target: int):
+        for dx, dy in self._directions(node, parent):
+            jump = self._jump(node, dx, dy, target)
+            if jump is not None:
+                yield jump
+
+    def _jump(self, cell: int, dx: int, dy: int, target: int) -> Optional[Tuple[int, float]]:
+        """Walks from a cell until it finds a jump point, returning it and the distance travelled"""
+        cells = self.grid.cells
+        stride = self.grid.stride
+        offset = dy * stride + dx
+        steps = 0
+
+        while True:
+            if dx and dy and (cells[cell + dx] >= IMPASSABLE or cells[cell + dy * stride] >= IMPASSABLE):
+                return None
+            cell += offset
+            steps += 1
+            if cells[cell] >= IMPASSABLE:
+                return None
+            if cell == target:
+                break
+
+            if dx and dy:
+                if self._jump(cell, dx, 0, target) is not None or self._jump(cell, 0, dy, target) is not None:
+                    break
+            elif _forced(cells, stride, cell, dx, dy):
+                break
+
+        return cell, steps * (SQRT2 if dx and dy else 1.0) * cells[cell]
+
+    def _table_successors(self, node: int, parent: int, target: int):
+        cells = self.grid.cells
+        stride = self.grid.stride
+        distances = self.tables.distances
+        ny, nx = divmod(node, stride)
+        ty, tx = divmod(target, stride)
+        gx = tx - nx
+        gy = ty - ny
+
+        for dx, dy in self._directions(node, parent):
+            distance = distances[(dx, dy)][node]
+            reach = abs(distance)
+            if dx and dy:
+                # stop level with the goal if it lies in this diagonal's quadrant
+                if gx * dx > 0 and gy * dy > 0:
+                    steps = min(abs(gx), abs(gy))
+                    if steps <= reach and steps != distance:
+                        yield node + steps * (dy * stride + dx), steps * SQRT2 * cells[node]
+                if distance > 0:
+                    yield node + distance * (dy * stride + dx), distance * SQRT2 * cells[node]
+            else:
+                # stop on the goal if it's straight ahead and closer than the next wall or jump point
+                along = gx * dx if dx else gy * dy
+                across = gy if dx else gx
+                if across == 0 and 0 < along <= reach:
+                    yield target, along * cells[node]
+                elif distance > 0:
+                    yield node + distance * (dy * stride + dx), distance * cells[node]
+
+    def _expand(self, parent: dict, source: int, target: int) -> list[Tuple[int, int]]:
+        """Fills in the tiles between each jump point"""
+        grid = self.grid
+        jumps = [target]
+        while jumps[-1] != source:
+            jumps.append(parent[jumps[-1]])
+        jumps.reverse()
+
+        path = [grid.xy(source)]
+        for a, b in zip(jumps, jumps[1:]):
+            ax, ay = grid.xy(a)
+            bx, by = grid.xy(b)
+            dx = (bx > ax) - (bx < ax)
+            dy = (by > ay) - (by < ay)
+            while (ax, ay) != (bx, by):
+                ax += dx
+                ay += dy
+                path.append((ax, ay))
+        return path
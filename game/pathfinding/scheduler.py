@@ -0,0 +1,156 @@
+"""
+Time-sliced pathfinding.
+
+Searching for a route inside an input handler stalls the frame, and a
+long or failing search stalls it for longer. Instead, callers submit a
+request and get a handle back straight away. The scheduler then
+advances the pending searches a slice at a time from the fixed update,
+never spending more than its budget in any one tick.
+"""
+
+import time
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+from game.pathfinding.cache import MISSING
+
+NODE_BUDGET = 512
+TIME_BUDGET_US = 1000
+SLICE = 64
+
+
+class PathRequest:
+    """
+    A handle to a path that has been asked for
+
+    Once `done` is set, `path` holds the tiles to visit or None if the
+    goal could not be reached. Cancelled requests are dropped without
+    calling their callback.
+    """
+
+    def __init__(self, key: tuple, on_complete: Optional[Callable[["PathRequest"], None]]) -> None:
+        self.key = key
+        self.on_complete = on_complete
+        self.search = None
+        self.version = -1
+        self.path = None
+        self.done = False
+        self.cancelled = False
+
+    @property
+    def start(self) -> Tuple[int, int]:
+        return self.key[0]
+
+    @property
+    def goal(self) -> Tuple[int, int]:
+        return self.key[1]
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class PathScheduler:
+    """
+    Runs path requests under a per-tick budget
+
+    Strategies are stepped through their `query` search, a slice at a
+    time, and pending requests take turns, so one long search can't
+    starve the rest. HPA* and JPS step an A* search over the tiles, as
+    their own searches can't be paused. A strategy without `query` runs
+    in a single slice.
+
+    Args:
+        game_map (GameMap): The map whose pathfinders and cache are used
+        node_budget (int): The most cells to expand per tick
+        time_budget_us (int): The most microseconds to spend per tick
+    """
+
+    def __init__(self, game_map, node_budget: int = NODE_BUDGET, time_budget_us: int = TIME_BUDGET_US) -> None:
+        self.game_map = game_map
+        self.node_budget = node_budget
+        self.time_budget_us = time_budget_us
+        self.pending = deque()
+        self.expanded = 0
+
+    def submit(self, start: Tuple[int, int], goal: Tuple[int, int],
+               on_complete: Callable[[PathRequest], None] = None,
+               strategy: str = None, any_angle: bool = None) -> PathRequest:
+        """
+        Queues a path request
+
+        Requests for unreachable goals and for cached paths are finished
+        immediately, without waiting for an update.
+
+        Args:
+            start (Tuple[int,int]): The tile to start from
+            goal (Tuple[int,int]): The tile to reach
+            on_complete (Callable): Called with the request once the path is known
+            strategy (str): The pathfinding strategy, defaults to the map's strategy
+            any_angle (bool): Smooth the path, defaults to the map's setting
+        """
+        reachable = self.game_map.reachable_goal(start, goal)
+        request = PathRequest(self.game_map.path_key(start, reachable or goal, strategy, any_angle), on_complete)
+        if reachable is None:
+            self._complete(request, None)
+            return request
+
+        path = self.game_map.path_cache.get(request.key)
+        if path is not MISSING:
+            self._complete(request, path)
+            return request
+
+        self._begin(request)
+        self.pending.append(request)
+        return request
+
+    def update(self) -> None:
+        """Advances the pending requests until the tick's budget is spent"""
+        deadline = time.perf_counter_ns() + self.time_budget_us * 1000
+        nodes = self.node_budget
+        self.expanded = 0
+
+        while self.pending and nodes > 0 and time.perf_counter_ns() < deadline:
+            request = self.pending.popleft()
+            if request.cancelled:
+                continue
+
+            # the costs changed under the search, so its result can't be trusted
+            if request.version != self.game_map.grid.version:
+                self._begin(request)
+
+            if request.search is None:
+                pathfinder = self.game_map.pathfinder(request.key[2])
+                path = pathfinder.find(request.start, request.goal)
+                nodes -= pathfinder.expanded
+                self.expanded += pathfinder.expanded
+                self._complete(request, self.game_map.store_path(request.key, path))
+                continue
+
+            before = request.search.expanded
+            done = request.search.step(min(nodes, SLICE))
+            nodes -= request.search.expanded - before
+            self.expanded += request.search.expanded - before
+
+            if done:
+                self._complete(request, self.game_map.store_path(request.key, request.search.path))
+            else:
+                self.pending.append(request)
+
+    def cancel_all(self) -> None:
+        for request in self.pending:
+            request.cancel()
+        self.pending.clear()
+
+    def _begin(self, request: PathRequest) -> None:
+        pathfinder = self.game_map.pathfinder(request.key[2])
+        query = getattr(pathfinder, "query", None)
+        request.search = query(request.start, request.goal) if query else None
+        request.version = self.game_map.grid.version
+
+    @staticmethod
+    def _complete(request: PathRequest, path) -> None:
+        request.path = path
+        request.done = True
+        request.search = None
+        if request.on_complete is not None:
+            request.on_complete(request)
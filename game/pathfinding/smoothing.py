@@ -0,0 +1,90 @@
+"""
+Any-angle post-processing for tile paths.
+
+Grid searches return one waypoint per tile, which makes ships zig-zag
+and turn at every tile. String pulling walks along a path and drops
+every waypoint that can be skipped with a straight line, so a route
+across open sea collapses to a handful of points.
+"""
+
+from typing import Tuple
+
+from game.pathfinding.grid import CostGrid, IMPASSABLE
+
+
+def line_of_sight(grid: CostGrid, a: Tuple[int, int], b: Tuple[int, int], ceiling: int = IMPASSABLE - 1) -> bool:
+    """
+    Checks if a straight line between two tile centres is clear
+
+    Every tile the line touches is visited (a supercover line), and
+    lines passing exactly through a corner must have both of the
+    tiles beside the corner clear, as ships are too wide to squeeze
+    between them.
+
+    Args:
+        grid (CostGrid): The grid to check
+        a (Tuple[int,int]): The tile the line starts in
+        b (Tuple[int,int]): The tile the line ends in
+        ceiling (int): The most expensive tile the line may cross
+    """
+    cells = grid.cells
+    stride = grid.stride
+    x, y = a
+    dx = b[0] - x
+    dy = b[1] - y
+    nx = abs(dx)
+    ny = abs(dy)
+    sx = 1 if dx > 0 else -1
+    sy = stride if dy > 0 else -stride
+    cell = grid.index(x, y)
+    ix = iy = 0
+
+    while ix < nx or iy < ny:
+        decision = (1 + 2 * ix) * ny - (1 + 2 * iy) * nx
+        if decision == 0:
+            if cells[cell + sx] > ceiling or cells[cell + sy] > ceiling:
+                return False
+            cell += sx + sy
+            ix += 1
+            iy += 1
+        elif decision < 0:
+            cell += sx
+            ix += 1
+        else:
+            cell += sy
+            iy += 1
+
+        if cells[cell] > ceiling:
+            return False
+
+    return True
+
+
+def smooth(grid: CostGrid, path: list[Tuple[int, int]]) -> list[Tuple[int, int]]:
+    """
+    Removes every waypoint that can be skipped with a straight line
+
+    A shortcut may only cross tiles that are no more expensive than the
+    tiles it replaces, so smoothing never drags a ship through the
+    shallows to save a corner.
+
+    Args:
+        grid (CostGrid): The grid the path was found on
+        path (list[Tuple[int,int]]): The tiles from start to goal
+    """
+    if len(path) < 3:
+        return list(path)
+
+    smoothed = [path[0]]
+    anchor = path[0]
+    ceiling = grid.cost(*path[1])
+    for i in range(1, len(path) - 1):
+        following = path[i + 1]
+        ceiling = max(ceiling, grid.cost(*following))
+        if not line_of_sight(grid, anchor, following, ceiling):
+            anchor = path[i]
+            smoothed.append(anchor)
+            ceiling = grid.cost(*following)
+
+    smoothed.append(path[-1])
+    return smoothed
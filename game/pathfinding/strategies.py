@@ -0,0 +1,19 @@
+"""
+The pathfinding strategies a map can search with.
+
+Each strategy is built from a cost grid and provides
+`find(start, goal)` returning a list of tiles or None.
+"""
+
+from functools import partial
+
+from game.pathfinding.astar import AStar
+from game.pathfinding.hpa import ClusterGraph
+from game.pathfinding.jps import JumpPointSearch
+
+PATHFINDERS = {
+    "astar": AStar,
+    "hpa": ClusterGraph,
+    "jps": JumpPointSearch,
+    "jps+": partial(JumpPointSearch, plus=True),
+}
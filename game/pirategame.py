@@ -1,14 +1,25 @@
+import atexit
 import random
 import pyasge
 from pyfmodex.flags import MODE
 
+from game.assets import AssetManager
 from game.gamedata import GameData
 from game.gameobjects.player import Player
 from game.gameobjects.gamemap import GameMap
 from game.gamestates.gameplay import GamePlay
+from game.gamestates.gamestate import GameStateID
+from game.profiler import Profiler
+from game.startup import Startup
 from tasks.task2_gamemenu import GameMenu
 from tasks.task2_gamewon import GameWon
 
+# show the menu as soon as the window is up and load the rest of the game behind it
+LAZY_STARTUP = True
+
+# time the game loop from the start, F1 toggles it while running and F2 saves a trace
+PROFILE = False
+
 
 class MyASGEGame(pyasge.ASGEGame):
     """The ASGE Game in Python."""
@@ -25,23 +36,31 @@ class MyASGEGame(pyasge.ASGEGame):
         :param settings: The game settings
         """
         pyasge.ASGEGame.__init__(self, settings)
+        self.startup = Startup()
         self.renderer.setClearColour(pyasge.COLOURS.BLACK)
         self.renderer.setBaseResolution(1920, 1080, pyasge.ResolutionPolicy.MAINTAIN)
         random.seed(a=None, version=2)
 
         # create a game data object, we can store all shared game content here
         self.data = GameData()
+        self.data.assets = AssetManager(self.renderer)
+        self.data.profiler = Profiler(PROFILE)
+        atexit.register(self.data.profiler.write_trace)
+        self.data.assets.register(GameStateID.START_MENU, GameMenu.ASSETS)
+        self.data.assets.register(GameStateID.GAMEPLAY, GamePlay.ASSETS)
         self.data.cursor = pyasge.Sprite()
-        self.data.game_map = GameMap(self.renderer)
         self.data.game_res = [1920, 1080]
         self.data.inputs = self.inputs
-        self.data.player = Player()
         self.data.renderer = self.renderer
 
-        # setup the background and load the fonts for the game
-        self.init_audio()
-        self.init_cursor()
-        self.init_fonts()
+        # the menu only needs the cursor and its font, everything else can wait
+        self.startup.run("cursor", self.init_cursor)
+        self.startup.run("menu font", self.init_menu_font)
+        self.startup.background("audio", self.init_audio)
+        self.startup.background("map", self.init_map)
+        self.startup.defer("map tiles", self.init_map_tiles, after="map")
+        self.startup.defer("player", self.init_player)
+        self.startup.defer("game fonts", self.init_fonts)
 
         # register the key and mouse click handlers for this class
         self.key_id = self.data.inputs.addCallback(pyasge.EventType.E_KEY, self.key_handler)
@@ -49,11 +68,20 @@ class MyASGEGame(pyasge.ASGEGame):
         self.mousemove_id = self.data.inputs.addCallback(pyasge.EventType.E_MOUSE_MOVE, self.move_handler)
 
         # start the game in the menu
+        self.startup.run("menu", self.init_menu)
+
+        if not LAZY_STARTUP:
+            self.startup.wait()
+
+    def init_menu(self) -> None:
+        """Loads the menu's textures and makes it the active state."""
+        self.data.assets.load(GameStateID.START_MENU)
         self.current_state = GameMenu(self.data)
+        self.states = {GameStateID.START_MENU: self.current_state}
 
     def init_cursor(self):
         """Initialises the mouse cursor and hides the OS cursor."""
-        self.data.cursor.loadTexture("./data/sprites/cursors/crosshairs.png")
+        self.data.assets.attach(self.data.cursor, "./data/sprites/cursors/crosshairs.png")
         self.data.cursor.width = 32
         self.data.cursor.height = 32
         self.data.cursor.src_rect = [0, 0, 128, 128]
@@ -71,9 +99,24 @@ class MyASGEGame(pyasge.ASGEGame):
         self.data.bg_audio_channel = self.data.audio_system.play_sound(self.data.bg_audio)
         self.data.bg_audio_channel.volume = 0.25
 
-    def init_fonts(self) -> None:
-        """Loads the game fonts."""
+    def init_map(self) -> None:
+        """Loads the map and builds its pathfinding data, without touching the renderer."""
+        self.data.game_map = GameMap(self.renderer, self.data.assets, self.data.profiler)
+
+    def init_map_tiles(self) -> None:
+        """Creates the map's tiles, which needs the renderer."""
+        self.data.game_map.build_tiles()
+
+    def init_player(self) -> None:
+        """Creates the player's ship."""
+        self.data.player = Player(self.data.assets)
+
+    def init_menu_font(self) -> None:
+        """Loads the font the menu is written in."""
         self.data.fonts['game'] = self.renderer.loadFont('./data/fonts/Kenney Pixel Square.ttf', 28, 4)
+
+    def init_fonts(self) -> None:
+        """Loads the fonts used during play."""
         self.data.fonts['debug'] = self.renderer.loadFont('./data/fonts/Kenney Future.ttf', 28)
 
         metrics = pyasge.AtlasMetrics()
@@ -100,21 +143,34 @@ class MyASGEGame(pyasge.ASGEGame):
     def key_handler(self, event: pyasge.KeyEvent) -> None:
         """Forwards Key events on to the active state."""
         self.current_state.key_handler(event)
+        if event.action == pyasge.KEYS.KEY_PRESSED and event.key == pyasge.KEYS.KEY_F1:
+            self.data.profiler.toggle()
+        if event.action == pyasge.KEYS.KEY_PRESSED and event.key == pyasge.KEYS.KEY_F2:
+            self.data.profiler.write_trace()
         if event.key == pyasge.KEYS.KEY_ESCAPE:
             self.signalExit()
 
     def fixed_update(self, game_time: pyasge.GameTime) -> None:
         """Processes fixed updates."""
-        self.current_state.fixed_update(game_time)
-        self.data.audio_system.update()
+        with self.data.profiler.section("fixed_update"):
+            with self.data.profiler.section("state.fixed_update"):
+                self.current_state.fixed_update(game_time)
+
+            # audio starts up in the background, so it may not be ready yet
+            if self.data.bg_audio_channel is not None:
+                with self.data.profiler.section("audio_system.update"):
+                    self.data.audio_system.update()
 
     # Imported methods
     from tasks.task2_update import update
 
     def render(self, game_time: pyasge.GameTime) -> None:
         """Renders the game state and mouse cursor"""
-        self.current_state.render(game_time)
-        self.renderer.render(self.data.cursor)
+        with self.data.profiler.section("render"):
+            with self.data.profiler.section("state.render"):
+                self.current_state.render(game_time)
+            self.renderer.render(self.data.cursor)
+        self.startup.frame()
 
 
 
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# how many samples each section keeps for its min/avg/p99
+FRAMES = 240
+
+# how many events the trace keeps, the oldest are dropped first
+TRACE_EVENTS = 200000
+TRACE_FILE = "./profile.trace.json"
+
+
+class Profiler:
+    """
+    Times named sections of the game loop
+
+    Each section keeps its last `frames` timings in a ring buffer, which
+    `summary` turns in to a min, average and 99th percentile. Every timed
+    section is also kept as a trace event, which `write_trace` saves in
+    the Chrome trace format, to be opened in chrome://tracing or Perfetto.
+
+    While disabled, `section` hands back a shared do-nothing context, so
+    the instrumented code only pays for a call and an attribute check.
+
+    Args:
+        enabled (bool): Start timing straight away
+        frames (int): How many timings each section keeps
+        events (int): How many trace events are kept
+    """
+
+    def __init__(self, enabled: bool = False, frames: int = FRAMES, events: int = TRACE_EVENTS) -> None:
+        self.enabled = enabled
+        self.frames = frames
+        self.started = time.perf_counter()
+        self.samples = {}
+        self.counts = {}
+        self.events = deque(maxlen=events)
+
+    def section(self, name: str):
+        """
+        A context that times the code inside it
+
+        Args:
+            name (str): The name the timings are kept under
+        """
+        if not self.enabled:
+            return NULL_SECTION
+        return Section(self, name)
+
+    def toggle(self) -> bool:
+        """ Turns timing on or off, returning whether it's now on """
+        self.enabled = not self.enabled
+        return self.enabled
+
+    def record(self, name: str, started: float, seconds: float) -> None:
+        """ Keeps the timing of a finished section """
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = np.zeros(self.frames)
+            self.counts[name] = 0
+
+        samples[self.counts[name] % self.frames] = seconds
+        self.counts[name] += 1
+        self.events.append((name, started, seconds, threading.get_ident()))
+
+    def summary(self) -> dict:
+        """
+        The timings of each section, in the order they were first seen
+
+        Returns:
+            dict: The min, average and 99th percentile of each section, in milliseconds
+        """
+        summary = {}
+        for name, samples in self.samples.items():
+            recent = samples[:min(self.counts[name], self.frames)] * 1000
+            summary[name] = (recent.min(), recent.mean(), np.percentile(recent, 99))
+        return summary
+
+    def write_trace(self, filename: str = TRACE_FILE) -> bool:
+        """
+        Saves the kept events as a Chrome trace
+
+        Returns:
+            bool: True if there was anything to save
+        """
+        if not self.events:
+            return False
+
+        events = [{
+            "name": name,
+            "ph": "X",
+            "ts": (started - self.started) * 1e6,
+            "dur": seconds * 1e6,
+            "pid": 0,
+            "tid": thread,
+        } for name, started, seconds, thread in list(self.events)]
+
+        with open(filename, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+        return True
+
+
+class Section:
+    """ Times one run of a section of code for a `Profiler` """
+
+    __slots__ = ("profiler", "name", "started")
+
+    def __init__(self, profiler: Profiler, name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.profiler.record(self.name, self.started, time.perf_counter() - self.started)
+
+
+class NullSection:
+    """ The section handed out while profiling is off, it does nothing """
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+NULL_SECTION = NullSection()
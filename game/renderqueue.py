@@ -0,0 +1,68 @@
+import pyasge
+
+
+class RenderQueue:
+    """
+    Collects the sprites to draw each frame and submits them in one go
+
+    Sprites outside the camera's view are culled. The rest are sorted by
+    z_order and then by texture, so sprites sharing a texture are drawn
+    back to back and the renderer can batch them instead of switching
+    textures between every draw. The counts for the last flushed frame
+    are kept in `stats`.
+    """
+
+    def __init__(self) -> None:
+        self.items = []
+        self.stats = {"submitted": 0, "culled": 0, "drawn": 0, "batches": 0}
+
+    def submit(self, sprite: pyasge.Sprite, texture) -> None:
+        """
+        Queues a sprite to be drawn when the queue is flushed
+
+        Args:
+            sprite (pyasge.Sprite): The sprite to draw
+            texture: Identifies the sprite's texture, sprites with equal keys are batched
+        """
+        self.items.append((sprite.z_order, texture, len(self.items), sprite))
+
+    def flush(self, renderer: pyasge.Renderer, view=None) -> None:
+        """
+        Draws the queued sprites that are in view and empties the queue
+
+        Args:
+            renderer (pyasge.Renderer): The renderer to draw with
+            view (pyasge.CameraView): The camera's view, nothing is culled without it
+        """
+        visible = self.items
+        if view is not None:
+            visible = [item for item in self.items if self.in_view(item[3], view)]
+
+        # the submission order breaks ties, so equal sprites don't flicker between frames
+        visible.sort(key=lambda item: (item[0], str(item[1]), item[2]))
+
+        batches = 0
+        previous = None
+        for z_order, texture, order, sprite in visible:
+            if texture != previous or batches == 0:
+                batches += 1
+                previous = texture
+            renderer.render(sprite)
+
+        self.stats = {
+            "submitted": len(self.items),
+            "culled": len(self.items) - len(visible),
+            "drawn": len(visible),
+            "batches": batches,
+        }
+        self.items = []
+
+    @staticmethod
+    def in_view(sprite: pyasge.Sprite, view) -> bool:
+        """ Checks if any part of a sprite, after rotation, overlaps the view """
+        bounds = sprite.getWorldBounds()
+        corners = (bounds.v1, bounds.v2, bounds.v3, bounds.v4)
+        return (min(corner.x for corner in corners) <= view.max_x and
+                max(corner.x for corner in corners) >= view.min_x and
+                min(corner.y for corner in corners) <= view.max_y and
+                max(corner.y for corner in corners) >= view.min_y)
@@ -0,0 +1,408 @@
+"""
+The game's simulation, without a window, renderer or audio device.
+
+The world state lives here: the ships, the cannonballs in flight and
+the flow field the enemies steer with. `Simulation.step` moves it all
+on by one fixed time step, so the same code runs inside the game, once
+per fixed update, or headless as fast as it will go, for tuning the AI,
+regression runs and benchmarks. The game's sprites and sounds are views
+over this state.
+
+Nothing here is random unless it goes through `Simulation.random`, so
+the same seed and the same inputs always step through the same states.
+"""
+
+import math
+import random
+from typing import Tuple
+
+import numpy as np
+
+from game.gameobjects.mapstream import gather
+from game.pathfinding.flowfield import FlowField
+from game.pathfinding.grid import CostGrid
+from game.spatialhash import SpatialHash
+
+# matches settings.fixed_ts in main.py
+FIXED_TIMESTEP = 1 / 120
+
+# a ship reaches a waypoint once it's within this many seconds of sailing from it
+ARRIVE_TIME = 0.02
+
+# chasing ships stop once they're this many tiles from their target
+ENGAGE_DISTANCE = 4
+
+CANNONBALL_SPEED = 8
+CANNONBALL_SIZE = 10
+
+# how many cannonballs can be in flight at once
+CANNONBALL_POOL = 256
+
+# how close a cannonball gets before it drops below the ships, and snaps on to its destination
+SPLASH_DISTANCE = 5
+SNAP_DISTANCE = 0.01
+
+# the events a step can raise, hits and sinkings are paired with the index of the ship
+# struck, misses with the index of the ship that fired
+HIT = "hit"
+SUNK = "sunk"
+MISS = "miss"
+
+
+class ShipState:
+    """
+    The state that moves a ship around, kept apart from its sprites
+
+    A ship has a sprite for each condition it can be in, but they all
+    share one position, rotation and size. Keeping them here means a
+    move is a couple of attribute writes, no matter how many frames the
+    ship has, and only the active frame is brought up to date when it's
+    drawn.
+
+    Ships either sail along their `route`, a list of [x, y] waypoints
+    for their top left corner, or `chase` the simulation's target.
+    """
+
+    __slots__ = ("x", "y", "direction_x", "direction_y", "rotation", "width", "height", "hp",
+                 "speed", "route", "chase")
+
+    def __init__(self) -> None:
+        self.x = 0.0
+        self.y = 0.0
+        self.direction_x = 0.0
+        self.direction_y = 0.0
+        self.rotation = 0.0
+        self.width = 0.0
+        self.height = 0.0
+        self.hp = 10
+        self.speed = 0.0
+        self.route = []
+        self.chase = False
+
+    def midpoint(self) -> Tuple[float, float]:
+        return self.x + self.width * 0.5, self.y + self.height * 0.5
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """ The axis aligned box around the rotated ship, as min x, min y, max x and max y """
+        cos = abs(math.cos(self.rotation))
+        sin = abs(math.sin(self.rotation))
+        half_x = (self.width * cos + self.height * sin) * 0.5
+        half_y = (self.width * sin + self.height * cos) * 0.5
+        mid_x, mid_y = self.midpoint()
+        return mid_x - half_x, mid_y - half_y, mid_x + half_x, mid_y + half_y
+
+    def head_for_route(self) -> None:
+        """ Points the ship's direction at its next waypoint """
+        if self.route:
+            dx = self.route[0][0] - self.x
+            dy = self.route[0][1] - self.y
+            if dx == 0 and dy == 0:
+                return
+
+            normalise = math.sqrt(dx * dx + dy * dy)
+            self.direction_x = dx / normalise
+            self.direction_y = dy / normalise
+
+
+class Projectiles:
+    """
+    The cannonballs in flight, stored as arrays and stepped together
+
+    Each active cannonball is a row in the arrays. Rows are packed at the
+    front, and a released row is filled by the last active one, so
+    spawning and releasing are both constant time and each step works
+    on one contiguous slice.
+
+    Args:
+        capacity (int): How many cannonballs can be in flight at once
+    """
+
+    def __init__(self, capacity: int = CANNONBALL_POOL) -> None:
+        self.capacity = capacity
+        self.count = 0
+        self.peak = 0
+
+        self.positions = np.zeros((capacity, 2))
+        self.destinations = np.zeros((capacity, 2))
+        self.splashing = np.zeros(capacity, dtype=bool)
+        self.owners = np.zeros(capacity, dtype=np.int32)
+
+    def spawn(self, x: float, y: float, target_x: float, target_y: float, owner: int = -1) -> int:
+        """
+        Launches a cannonball so it lands centred on the target
+
+        Returns:
+            int: Its row, or -1 if they're all in flight
+        """
+        if self.count == self.capacity:
+            return -1
+
+        slot = self.count
+        self.count += 1
+        self.peak = max(self.peak, self.count)
+
+        self.positions[slot] = x, y
+        self.destinations[slot] = target_x - CANNONBALL_SIZE * 0.5, target_y - CANNONBALL_SIZE * 0.5
+        self.splashing[slot] = False
+        self.owners[slot] = owner
+        return slot
+
+    def release(self, slot: int) -> None:
+        """ Removes a cannonball, moving the last one in to its row """
+        self.count -= 1
+        end = self.count
+        if slot != end:
+            self.positions[slot] = self.positions[end]
+            self.destinations[slot] = self.destinations[end]
+            self.splashing[slot] = self.splashing[end]
+            self.owners[slot] = self.owners[end]
+
+    def clear(self) -> None:
+        self.count = 0
+
+    def step(self, timestep: float) -> None:
+        """ Eases every cannonball towards its destination, then snaps the ones that are close enough """
+        count = self.count
+        positions = self.positions[:count]
+        destinations = self.destinations[:count]
+        positions += (destinations - positions) * (CANNONBALL_SPEED * timestep)
+
+        offsets = destinations - positions
+        self.splashing[:count] |= np.hypot(offsets[:, 0], offsets[:, 1]) < SPLASH_DISTANCE
+        snap = np.abs(offsets) < SNAP_DISTANCE
+        positions[snap] = destinations[snap]
+
+    def bounds(self) -> list:
+        """ The world space box of each cannonball, by row """
+        boxes = np.empty((self.count, 4))
+        boxes[:, :2] = self.positions[:self.count]
+        boxes[:, 2:] = self.positions[:self.count] + CANNONBALL_SIZE
+        return boxes.tolist()
+
+    def landed(self, tile_size, width: int, height: int, islands) -> list:
+        """
+        Finds the cannonballs that have reached their destinations
+
+        The tiles they landed on are looked up in the islands layer in
+        one go, with positions off the map clamped to its edge.
+
+        Returns:
+            list: The row of each landed cannonball, paired with True if it fell in the water
+        """
+        count = self.count
+        arrived = np.flatnonzero((self.positions[:count] == self.destinations[:count]).all(axis=1))
+        if not len(arrived):
+            return []
+
+        tiles = (self.positions[arrived] // tile_size).astype(np.intp)
+        np.clip(tiles, 0, [width - 1, height - 1], out=tiles)
+        water = gather(islands, tiles) == 0
+        return list(zip(arrived.tolist(), water.tolist()))
+
+    def in_view(self, min_x: float, min_y: float, max_x: float, max_y: float) -> np.ndarray:
+        """ The rows of the cannonballs overlapping a box """
+        positions = self.positions[:self.count]
+        return np.flatnonzero((positions[:, 0] + CANNONBALL_SIZE >= min_x) & (positions[:, 0] <= max_x) &
+                              (positions[:, 1] + CANNONBALL_SIZE >= min_y) & (positions[:, 1] <= max_y))
+
+
+class Simulation:
+    """
+    The state of the game world and the rules that move it on
+
+    Ships are added by their `ShipState` and referred to by the order
+    they were added in. Every chasing ship hunts the ship at index
+    `target`, the player in the game. Each step appends what happened,
+    such as hits and misses, to `events`, for the game to turn in to
+    sounds and score.
+
+    Args:
+        width (int): The map's width in tiles
+        height (int): The map's height in tiles
+        tile_size: The width and height of a tile in pixels
+        islands: The gids of the islands layer, a cannonball landing on 0 splashes
+        flow_field (FlowField): The field the chasing ships steer with
+        timestep (float): The seconds each step simulates
+        seed (int): Seeds `random`, None seeds it from the OS
+        capacity (int): How many cannonballs can be in flight at once
+    """
+
+    def __init__(self, width: int, height: int, tile_size, islands, flow_field: FlowField,
+                 timestep: float = FIXED_TIMESTEP, seed: int = None, capacity: int = CANNONBALL_POOL) -> None:
+        self.width = width
+        self.height = height
+        self.tile_size = tuple(tile_size)
+        self.islands = islands
+        self.flow_field = flow_field
+        self.timestep = timestep
+        self.random = random.Random(seed)
+
+        self.ships = []
+        self.target = 0
+        self.projectiles = Projectiles(capacity)
+        self.ship_hash = SpatialHash(self.tile_size[0])
+        self.events = []
+        self.ticks = 0
+
+    @classmethod
+    def from_map(cls, game_map, **kwargs) -> "Simulation":
+        """ Simulates the game's map, sharing its flow field and so its costs """
+        return cls(game_map.width, game_map.height, game_map.tile_size, game_map.layers["Islands"],
+                   game_map.flow_field, **kwargs)
+
+    @classmethod
+    def from_map_data(cls, data, **kwargs) -> "Simulation":
+        """ Simulates a map loaded without a renderer, e.g. by `load_map` """
+        grid = CostGrid(data.costs.tolist())
+        return cls(data.width, data.height, data.tile_size, data.layers["Islands"], FlowField(grid), **kwargs)
+
+    def add_ship(self, ship: ShipState) -> int:
+        """ Adds a ship to the world, returning its index """
+        self.ships.append(ship)
+        return len(self.ships) - 1
+
+    def clear(self) -> None:
+        """ Removes every ship and cannonball """
+        self.ships = []
+        self.projectiles.clear()
+        self.events = []
+        self.ticks = 0
+
+    def fire(self, owner: int, x: float, y: float, target_x: float, target_y: float) -> bool:
+        """
+        Fires a cannonball from a ship, which it can't then hit
+
+        Returns:
+            bool: False if every cannonball is already in flight
+        """
+        return self.projectiles.spawn(x, y, target_x, target_y, owner) != -1
+
+    def sail(self, index: int, waypoints) -> None:
+        """ Sends a ship along a route, given as the [x, y] points its middle should pass through """
+        ship = self.ships[index]
+        ship.route = [[x - ship.width * 0.5, y - ship.height * 0.5] for x, y in waypoints]
+        ship.head_for_route()
+
+    def tile(self, x: float, y: float) -> Tuple[int, int]:
+        return int(x / self.tile_size[0]), int(y / self.tile_size[1])
+
+    def step(self, timestep: float = None) -> None:
+        """ Moves the world on by one fixed time step """
+        timestep = timestep or self.timestep
+        self.events.clear()
+
+        if self.projectiles.count:
+            self.projectiles.step(timestep)
+            self.resolve()
+
+        for ship in self.ships:
+            if ship.route:
+                self.follow_route(ship, timestep)
+
+        self.chase(timestep)
+        self.ticks += 1
+
+    def run(self, ticks: int) -> None:
+        """ Steps the world a number of times """
+        for _ in range(ticks):
+            self.step()
+
+    def resolve(self) -> None:
+        """
+        Checks the cannonballs for hits and landings
+
+        The ships are hashed in to tile sized cells, so each cannonball
+        is only checked against the ships sharing a cell with it. A
+        cannonball stops at the first ship it hits other than the one
+        that fired it. Spent cannonballs are released once every one
+        has been checked.
+        """
+        projectiles = self.projectiles
+        self.ship_hash.clear()
+        for index, ship in enumerate(self.ships):
+            if ship.hp > 0:
+                self.ship_hash.insert(index, ship.bounds())
+
+        spent = {}
+        owners = projectiles.owners[:projectiles.count].tolist()
+        for slot, bounds in enumerate(projectiles.bounds()):
+            for index in self.ship_hash.query(bounds):
+                if index != owners[slot]:
+                    self.hit(index)
+                    spent[slot] = None
+                    break
+
+        # the ones that landed without hitting anything splash if they missed the islands
+        for slot, water in projectiles.landed(self.tile_size, self.width, self.height, self.islands):
+            if slot not in spent:
+                if water:
+                    self.events.append((MISS, owners[slot]))
+                spent[slot] = None
+
+        # releasing moves the last row down, so release from the back
+        for slot in sorted(spent, reverse=True):
+            projectiles.release(slot)
+
+    def hit(self, index: int) -> None:
+        """ Damages a ship hit by a cannonball """
+        ship = self.ships[index]
+        ship.hp -= 1
+        self.events.append((HIT, index))
+        if ship.hp == 0:
+            self.events.append((SUNK, index))
+
+    def follow_route(self, ship: ShipState, timestep: float) -> None:
+        """ Sails a ship towards its next waypoint at a constant speed, facing the way it's going """
+        target = ship.route[0]
+        if math.hypot(target[0] - ship.x, target[1] - ship.y) < ship.speed * ARRIVE_TIME:
+            ship.route.pop(0)
+            ship.x, ship.y = target
+            ship.head_for_route()
+        else:
+            step = ship.speed * timestep
+            ship.x += ship.direction_x * step
+            ship.y += ship.direction_y * step
+
+        if ship.route:
+            dx = ship.route[0][0] - ship.x
+            dy = ship.route[0][1] - ship.y
+            if dx or dy:
+                ship.rotation = math.atan2(dy, dx) - 1.5708
+
+    def chase(self, timestep: float) -> None:
+        """
+        Steers the chasing ships along the flow field towards the target
+
+        Each ship looks up which neighbouring tile is one step closer to
+        the target and sails towards its centre, stopping once it is
+        within ENGAGE_DISTANCE of the target.
+        """
+        chasing = [ship for ship in self.ships if ship.chase and ship.hp > 0]
+        if not chasing or self.target >= len(self.ships):
+            return
+
+        field = self.flow_field
+        field.update([self.tile(*self.ships[self.target].midpoint())])
+
+        tile_width, tile_height = self.tile_size
+        for ship in chasing:
+
+            mid_x, mid_y = ship.midpoint()
+            tile_x, tile_y = self.tile(mid_x, mid_y)
+            if field.distance(tile_x, tile_y) <= ENGAGE_DISTANCE:
+                continue
+
+            dx, dy = field.direction(tile_x, tile_y)
+            if dx == 0 and dy == 0:
+                continue
+
+            vx = (tile_x + dx + 1) * tile_width - tile_width * 0.5 - mid_x
+            vy = (tile_y + dy + 1) * tile_height - tile_height * 0.5 - mid_y
+            length = math.hypot(vx, vy)
+            if length == 0:
+                continue
+
+            step = ship.speed * timestep
+            ship.x += vx / length * step
+            ship.y += vy / length * step
+            ship.rotation = math.atan2(vy, vx) - 1.5708
@@ -0,0 +1,78 @@
+from typing import Tuple
+
+# min_x, min_y, max_x, max_y in world space
+Bounds = Tuple[float, float, float, float]
+
+
+def world_aabb(quad) -> Bounds:
+    """ The axis aligned box around a sprite's world bounds, which may be rotated """
+    corners = (quad.v1, quad.v2, quad.v3, quad.v4)
+    return (min(corner.x for corner in corners), min(corner.y for corner in corners),
+            max(corner.x for corner in corners), max(corner.y for corner in corners))
+
+
+def overlaps(a: Bounds, b: Bounds) -> bool:
+    return a[0] < b[2] and a[2] > b[0] and a[1] < b[3] and a[3] > b[1]
+
+
+class SpatialHash:
+    """
+    A uniform grid of cells that objects are hashed in to by their bounds
+
+    Objects are inserted in to every cell their box touches, so a query
+    only has to test the objects sharing a cell with it, instead of every
+    object in the world. The grid is sparse, only cells with something in
+    them are stored, and it's meant to be cleared and refilled each tick.
+
+    Args:
+        cell_size (float): The width and height of each cell, in pixels
+    """
+
+    def __init__(self, cell_size: float = 128) -> None:
+        self.cell_size = cell_size
+        self.cells = {}
+        self.bounds = {}
+        self.order = {}
+
+    def clear(self) -> None:
+        """ Empties every cell """
+        self.cells.clear()
+        self.bounds.clear()
+        self.order.clear()
+
+    def insert(self, item, bounds: Bounds) -> None:
+        """
+        Adds an object to each cell its bounds touch
+
+        Args:
+            item: The object, it must be hashable
+            bounds (Bounds): Its box in world space
+        """
+        self.bounds[item] = bounds
+        self.order.setdefault(item, len(self.order))
+        for cell in self.cells_in(bounds):
+            self.cells.setdefault(cell, []).append(item)
+
+    def query(self, bounds: Bounds) -> list:
+        """
+        Finds the objects whose bounds overlap a box
+
+        Only the objects sharing a cell with the box are tested. They're
+        returned in the order they were inserted, so results don't depend
+        on where the cell boundaries fall.
+        """
+        found = {}
+        for cell in self.cells_in(bounds):
+            for item in self.cells.get(cell, ()):
+                if item not in found and overlaps(self.bounds[item], bounds):
+                    found[item] = None
+        if len(found) > 1:
+            return sorted(found, key=self.order.__getitem__)
+        return list(found)
+
+    def cells_in(self, bounds: Bounds):
+        """ The cells a box touches """
+        size = self.cell_size
+        for y in range(int(bounds[1] // size), int(bounds[3] // size) + 1):
+            for x in range(int(bounds[0] // size), int(bounds[2] // size) + 1):
+                yield x, y
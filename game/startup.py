@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+
+class Startup:
+    """
+    Runs the game's loading phases and times each of them
+
+    Phases can run straight away, on a background thread, or be deferred
+    to the main thread where `pump` runs one per frame, so the window can
+    show the menu while the rest of the game loads. Anything that needs
+    the renderer must stay on the main thread. `wait` is the barrier that
+    finishes everything before the game proper starts.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.timings = []
+        self.first_frame = None
+        self.deferred = deque()
+        self.threads = {}
+        self.errors = []
+        self.reported = False
+        self.lock = threading.Lock()
+
+    def run(self, name: str, phase: Callable[[], None]) -> None:
+        """ Runs a phase now, on the calling thread """
+        self._timed(name, "main", phase)
+
+    def background(self, name: str, phase: Callable[[], None]) -> None:
+        """ Runs a phase on its own thread, it must not touch the renderer """
+        def worker():
+            try:
+                self._timed(name, "thread", phase)
+            except Exception as error:
+                with self.lock:
+                    self.errors.append(error)
+
+        self.threads[name] = threading.Thread(target=worker, name=f"startup-{name}", daemon=True)
+        self.threads[name].start()
+
+    def defer(self, name: str, phase: Callable[[], None], after: str = None) -> None:
+        """ Queues a phase for the main thread, optionally once a background phase is done """
+        self.deferred.append((name, phase, after))
+
+    def frame(self) -> None:
+        """ Marks a frame as drawn, the first one is when the window stopped being blank """
+        if self.first_frame is None:
+            self.first_frame = time.perf_counter() - self.started
+
+    def pump(self) -> None:
+        """ Runs the next deferred phase that's ready, reporting once everything has finished """
+        for deferred in self.deferred:
+            name, phase, after = deferred
+            if after is None or not self.threads[after].is_alive():
+                # the phase it waited on may have failed, leaving nothing to build on
+                self._check()
+                self.deferred.remove(deferred)
+                self._timed(name, "deferred", phase)
+                break
+
+        if self.ready and not self.reported:
+            self._check()
+            self.report()
+
+    def wait(self) -> None:
+        """ Finishes every phase, the barrier before anything that needs the whole game loaded """
+        while self.deferred:
+            name, phase, after = self.deferred.popleft()
+            if after is not None:
+                self.threads[after].join()
+                self._check()
+            self._timed(name, "deferred", phase)
+
+        for thread in self.threads.values():
+            thread.join()
+
+        self._check()
+        if not self.reported:
+            self.report()
+
+    @property
+    def ready(self) -> bool:
+        return not self.deferred and not any(t.is_alive() for t in self.threads.values())
+
+    def report(self) -> None:
+        """ Prints how long each phase took """
+        self.reported = True
+        total = time.perf_counter() - self.started
+        print(f"startup: {total * 1000:.1f} ms in total", end="")
+        if self.first_frame is not None:
+            print(f", first frame after {self.first_frame * 1000:.1f} ms", end="")
+        print()
+
+        for name, where, seconds in self.timings:
+            print(f"  {name:<18}{where:<10}{seconds * 1000:>9.1f} ms")
+
+    def _timed(self, name: str, where: str, phase: Callable[[], None]) -> None:
+        started = time.perf_counter()
+        phase()
+        with self.lock:
+            self.timings.append((name, where, time.perf_counter() - started))
+
+    def _check(self) -> None:
+        # a background phase that failed would otherwise leave the game half loaded
+        if self.errors:
+            raise self.errors[0]
@@ -10,6 +10,8 @@ from game.gamedata import GameData
 
 class GameMenu(GameState):
 
+    ASSETS = ["/data/sprites/backdrops/Sample.png", "/data/Levelgreen-min.png", "/data/Levelreoundred-min.png"]
+
     def __init__(self, gamedata: GameData) -> None:
         super().__init__(gamedata)
         self.id = GameStateID.START_MENU
@@ -22,6 +24,13 @@ class GameMenu(GameState):
         self.initPlay()
         self.initQuit()
 
+        # read the game's textures from disk while the player is in the menu
+        self.data.assets.prefetch(GameStateID.GAMEPLAY)
+
+    def reset(self) -> None:
+        self.transition = False
+        self.data.assets.prefetch(GameStateID.GAMEPLAY)
+
     def click_handler(self, event: pyasge.ClickEvent) -> None:
         if self.isInside(self.playButton, event.x, event.y):
             self.transition = True
@@ -53,7 +62,7 @@ class GameMenu(GameState):
 
     def initBackground(self) -> bool:
 
-        if self.background.loadTexture("/data/sprites/backdrops/Sample.png"):
+        if self.data.assets.attach(self.background, "/data/sprites/backdrops/Sample.png"):
             # loaded, so make sure this gets rendered first
             self.background.z_order = -100
             self.background.scale = 2.1
@@ -70,7 +79,7 @@ class GameMenu(GameState):
         return True
 
     def initPlay(self)-> bool:
-        if self.playButton.loadTexture("/data/Levelgreen-min.png"):
+        if self.data.assets.attach(self.playButton, "/data/Levelgreen-min.png"):
             # loaded, so make sure this gets rendered first
             self.playButton.z_order = -10
             self.playButton.x = 450
@@ -80,7 +89,7 @@ class GameMenu(GameState):
             return False
 
     def initQuit(self)-> bool:
-        if self.quitButton.loadTexture("/data/Levelreoundred-min.png"):
+        if self.data.assets.attach(self.quitButton, "/data/Levelreoundred-min.png"):
             # loaded, so make sure this gets rendered first
             self.quitButton.z_order = -10
             self.quitButton.x = 950
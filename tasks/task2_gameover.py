@@ -13,6 +13,9 @@ class GameOver(GameState):
         self.initText()
         self.transition = False
 
+    def reset(self) -> None:
+        self.transition = False
+
     def click_handler(self, event: pyasge.ClickEvent) -> None:
         print("processing click event")
 
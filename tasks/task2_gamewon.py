@@ -12,6 +12,9 @@ class GameWon(GameState):
         self.transition = False
         self.initText()
 
+    def reset(self) -> None:
+        self.transition = False
+
     def click_handler(self, event: pyasge.ClickEvent) -> None:
         pass
 
@@ -12,16 +12,36 @@ from tasks.task2_gamewon import GameWon
 from tasks.task2_gameover import GameOver
 
 
+STATES = {
+    GameStateID.START_MENU: GameMenu,
+    GameStateID.GAMEPLAY: GamePlay,
+    GameStateID.GAME_OVER: GameOver,
+    GameStateID.WINNER_WINNER: GameWon,
+}
+
+
 def update(self, game_time: pyasge.GameTime) -> None:
-    # delegate the update logic to the active state
-    new_state = self.current_state.update(game_time)
-    if self.current_state.id != new_state:
-        if new_state is GameStateID.START_MENU:
-            self.current_state = GameMenu(self.data)
-        elif new_state is GameStateID.GAMEPLAY:
-            self.current_state = GamePlay(self.data)
-        elif new_state is GameStateID.GAME_OVER:
-            self.current_state = GameOver(self.data)
-        elif new_state is GameStateID.WINNER_WINNER:
-            self.current_state = GameWon(self.data)
+    with self.data.profiler.section("update"):
+        # carry on loading whatever the menu didn't need
+        self.startup.pump()
+
+        # delegate the update logic to the active state
+        with self.data.profiler.section("state.update"):
+            new_state = self.current_state.update(game_time)
+
+        if self.current_state.id != new_state and new_state in STATES:
+            # the game can't start until everything has loaded
+            if new_state is GameStateID.GAMEPLAY:
+                self.startup.wait()
+
+            # swap the textures over before the new state starts spawning things
+            self.data.assets.unload(self.current_state.id)
+            self.data.assets.load(new_state)
 
+            # states are built once and reset when they're entered again
+            if new_state in self.states:
+                self.current_state = self.states[new_state]
+                self.current_state.reset()
+            else:
+                self.current_state = STATES[new_state](self.data)
+                self.states[new_state] = self.current_state
@@ -1,8 +1,10 @@
 import pyasge
+from game.assets import AssetManager
 from game.fsm import FSM
 from game.gameobjects.ship import Ship
 from tasks.task1_shipstates import update_healthy, update_damaged, update_very_damaged, deaded
 from tasks.task4_behaviourtree import BehaviourTree
+ENEMY_SPEED = 250
 
 
 class Enemy(Ship):
@@ -18,24 +20,29 @@ class Enemy(Ship):
     work.
     """
 
-    def __init__(self) -> None:
-        super().__init__()
+    FRAMES = ["data/sprites/ships/ship (4).png",
+              "data/sprites/ships/ship (10).png",
+              "data/sprites/ships/ship (16).png",
+              "data/sprites/ships/ship (22).png"]
 
-        filenames = ["data/sprites/ships/ship (4).png",
-                     "data/sprites/ships/ship (10).png",
-                     "data/sprites/ships/ship (16).png",
-                     "data/sprites/ships/ship (22).png"]
+    def __init__(self, assets: AssetManager) -> None:
+        super().__init__()
 
-        for filename in filenames:
+        for filename in self.FRAMES:
             self.frames.append(pyasge.Sprite())
-            self.frames[-1].loadTexture(filename)
+            assets.attach(self.frames[-1], filename)
+            self.frame_textures.append(filename)
             self.frames[-1].z_order = 2
-            self.frames[-1].width = 66
-            self.frames[-1].height = 113
 
         self.active_frame = self.frames[0]
+        self.width = 66
+        self.height = 113
         self.behaviour = BehaviourTree()
 
+        # the simulation steers it along the flow field towards the player
+        self.state.speed = ENEMY_SPEED
+        self.state.chase = True
+
     def update(self, game_time: pyasge.GameTime) -> None:
         """ Updates the enemy and its FSM
 
@@ -55,4 +62,5 @@ class Enemy(Ship):
 
     def render(self, renderer: pyasge.Renderer, game_time: pyasge.GameTime) -> None:
         """ Renders the enemy ship """
+        self.sync()
         renderer.render(self.active_frame)
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+pytest.importorskip("pyasge")
+
+from game.assets import AssetManager  # noqa: E402
+
+TEXTURE = "./data/sprites/ship parts/cannonBall.png"
+
+
+class Renderer:
+    def __init__(self) -> None:
+        self.loads = 0
+
+    def loadTexture(self, filename: str):
+        self.loads += 1
+        return object()
+
+
+class Sprite:
+    def attach(self, texture) -> bool:
+        self.texture = texture
+        return True
+
+
+def test_unload_keeps_textures_attached_to_sprites():
+    renderer = Renderer()
+    assets = AssetManager(renderer, evict=True)
+    assets.register("gameplay", [TEXTURE])
+    assets.load("gameplay")
+
+    sprites = [Sprite() for _ in range(4)]
+    for sprite in sprites:
+        assets.attach(sprite, TEXTURE)
+
+    # the sprites outlive the state, so coming back must not upload a second copy
+    assets.unload("gameplay")
+    assets.load("gameplay")
+    assert renderer.loads == 1
+    assert assets.texture(TEXTURE) is sprites[0].texture
+
+
+def test_unload_evicts_once_sprites_are_detached():
+    assets = AssetManager(Renderer(), evict=True)
+    assets.register("gameplay", [TEXTURE])
+    assets.load("gameplay")
+    for sprite in [Sprite() for _ in range(4)]:
+        assets.attach(sprite, TEXTURE)
+
+    for _ in range(4):
+        assets.detach(TEXTURE)
+    assets.unload("gameplay")
+    assert not assets.textures
+    assert not assets.refs
+
+
+def test_names_are_only_resolved_once(monkeypatch):
+    assets = AssetManager(Renderer())
+    assets.acquire(TEXTURE)
+
+    def resolve(path):
+        raise AssertionError("resolved " + path)
+
+    monkeypatch.setattr(os.path, "realpath", resolve)
+    assets.acquire(TEXTURE)
+    assets.release(TEXTURE)
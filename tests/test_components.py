@@ -0,0 +1,33 @@
+import random
+
+from game.pathfinding.components import ComponentIndex
+from game.pathfinding.grid import CostGrid, IMPASSABLE
+
+
+def regions(index: ComponentIndex, width: int, height: int) -> set:
+    """ The tiles of each region, so labellings can be compared whatever their numbers """
+    tiles = {}
+    for y in range(height):
+        for x in range(width):
+            tiles.setdefault(index.label(x, y), set()).add((x, y))
+    return {frozenset(group) for group in tiles.values()}
+
+
+def test_edits_match_a_fresh_labelling():
+    rng = random.Random(5)
+    grid = CostGrid([[IMPASSABLE if rng.random() < 0.3 else 1 for _ in range(16)] for _ in range(12)])
+    index = ComponentIndex(grid)
+
+    for _ in range(300):
+        grid.set_cost(rng.randrange(16), rng.randrange(12), rng.choice((1, IMPASSABLE)))
+        fresh = ComponentIndex(CostGrid([[grid.cost(x, y) for x in range(16)] for y in range(12)]))
+        assert regions(index, 16, 12) == regions(fresh, 16, 12)
+
+
+def test_blocking_open_water_keeps_its_label():
+    grid = CostGrid([[1] * 40 for _ in range(40)])
+    index = ComponentIndex(grid)
+    label = index.label(0, 0)
+
+    grid.set_cost(20, 20, IMPASSABLE)
+    assert index.label(0, 0) == label == index.label(39, 39)
@@ -0,0 +1,34 @@
+import random
+
+from game.pathfinding.flowfield import FlowField
+from game.pathfinding.grid import CostGrid, IMPASSABLE
+
+
+def test_edits_match_a_fresh_field():
+    rng = random.Random(4)
+    costs = [[rng.choice((1, 1, 1, 3, IMPASSABLE)) for _ in range(30)] for _ in range(20)]
+    grid = CostGrid(costs)
+    field = FlowField(grid)
+    field.update([(15, 10)])
+
+    for _ in range(40):
+        x, y = rng.randrange(30), rng.randrange(20)
+        grid.set_cost(x, y, rng.choice((1, 2, IMPASSABLE)))
+        field.update([(15, 10)])
+
+        fresh = FlowField(CostGrid([[grid.cost(x, y) for x in range(30)] for y in range(20)]))
+        fresh.update([(15, 10)])
+        for ty in range(20):
+            for tx in range(30):
+                assert field.distance(tx, ty) == fresh.distance(tx, ty)
+                assert field.direction(tx, ty) == fresh.direction(tx, ty)
+
+
+def test_cache_is_bounded_by_tiles():
+    grid = CostGrid([[1] * 20 for _ in range(20)])
+    field = FlowField(grid, capacity=1000)
+    for x in range(20):
+        field.update([(x, 0)])
+        assert sum(len(cached[0]) for cached in field.fields.values()) <= 1000
+        field.distance(19 - x, 19)
+    assert len(field.fields) < 20
@@ -0,0 +1,32 @@
+import random
+
+from game.pathfinding.astar import AStar
+from game.pathfinding.grid import CostGrid, IMPASSABLE
+from game.pathfinding.hpa import ClusterGraph
+
+
+def contiguous(path) -> bool:
+    return all(abs(x1 - x2) + abs(y1 - y2) == 1 for (x1, y1), (x2, y2) in zip(path, path[1:]))
+
+
+def test_single_column_map_matches_astar():
+    # narrower than a cluster, so every border between clusters is horizontal
+    rng = random.Random(2)
+    for _ in range(20):
+        costs = [[IMPASSABLE if rng.random() < 0.3 else 1 for _ in range(3)] for _ in range(40)]
+        grid = CostGrid(costs)
+        hpa = ClusterGraph(grid, cluster_size=8)
+        astar = AStar(grid)
+
+        for _ in range(20):
+            start = (rng.randrange(3), rng.randrange(40))
+            goal = (rng.randrange(3), rng.randrange(40))
+            if not grid.walkable(*start):
+                continue
+
+            expected = astar.find(start, goal)
+            path = hpa.find(start, goal)
+            assert (path is None) == (expected is None), (start, goal)
+            if path:
+                assert path[0] == start and path[-1] == goal
+                assert contiguous(path)
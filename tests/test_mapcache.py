@@ -0,0 +1,27 @@
+import os
+import shutil
+
+import numpy as np
+
+from game.gameobjects.mapcache import cache_path, content_hash, load_map, read_cache
+
+
+def copy_map(directory) -> str:
+    for name in ("worldmap.tmx", "tiles_sheet@2.tsx", "tiles_sheet@2.png"):
+        shutil.copy(os.path.join("data", name), directory)
+    return os.path.join(directory, "worldmap.tmx")
+
+
+def test_truncated_cache_is_rebuilt(tmp_path):
+    tmx = copy_map(tmp_path)
+    expected = load_map(tmx)
+    size = os.path.getsize(cache_path(tmx))
+
+    # cut the arrays short, leaving the header and its hash intact
+    with open(cache_path(tmx), "r+b") as file:
+        file.truncate(size // 2)
+    assert read_cache(tmx, content_hash(tmx)) is None
+
+    data = load_map(tmx)
+    assert np.array_equal(data.costs, expected.costs)
+    assert os.path.getsize(cache_path(tmx)) == size
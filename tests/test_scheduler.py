@@ -0,0 +1,52 @@
+import pytest
+
+from game.pathfinding.cache import MISSING
+from game.pathfinding.grid import CostGrid
+from game.pathfinding.scheduler import PathScheduler
+from game.pathfinding.strategies import PATHFINDERS
+
+
+class Map:
+    """ The parts of GameMap the scheduler uses """
+
+    def __init__(self, size: int) -> None:
+        self.grid = CostGrid([[1] * size for _ in range(size)])
+        self.pathfinders = {}
+        self.paths = {}
+
+    def reachable_goal(self, start, goal):
+        return goal
+
+    def path_key(self, start, goal, strategy, any_angle):
+        return start, goal, strategy, False
+
+    def pathfinder(self, strategy):
+        if strategy not in self.pathfinders:
+            self.pathfinders[strategy] = PATHFINDERS[strategy](self.grid)
+        return self.pathfinders[strategy]
+
+    @property
+    def path_cache(self):
+        return self
+
+    def get(self, key):
+        return self.paths.get(key, MISSING)
+
+    def store_path(self, key, path):
+        self.paths[key] = path
+        return path
+
+
+@pytest.mark.parametrize("strategy", ["hpa", "jps", "jps+"])
+def test_every_strategy_keeps_to_the_node_budget(strategy):
+    game_map = Map(60)
+    scheduler = PathScheduler(game_map, node_budget=16, time_budget_us=10 ** 6)
+    request = scheduler.submit((0, 0), (59, 59), strategy=strategy)
+
+    ticks = 0
+    while not request.done:
+        scheduler.update()
+        assert scheduler.expanded <= 16
+        ticks += 1
+    assert ticks > 1
+    assert request.path[0] == (0, 0) and request.path[-1] == (59, 59)
@@ -0,0 +1,20 @@
+import pytest
+
+from game.startup import Startup
+
+
+def failing_map():
+    raise ValueError("corrupt map")
+
+
+@pytest.mark.parametrize("finish", ["pump", "wait"])
+def test_background_error_is_raised_before_dependent_phase(finish):
+    startup = Startup()
+    ran = []
+    startup.background("map", failing_map)
+    startup.defer("map tiles", lambda: ran.append("map tiles"), after="map")
+    startup.threads["map"].join()
+
+    with pytest.raises(ValueError, match="corrupt map"):
+        getattr(startup, finish)()
+    assert not ran